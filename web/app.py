@@ -8,15 +8,26 @@ import os
 import json
 import time
 import numpy as np
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, send_from_directory, url_for
 from flask_socketio import SocketIO, emit
 from werkzeug.utils import secure_filename
 import threading
 import queue
-from funasr import AutoModel
 import base64
+import sqlite3
 import pyaudio
 import datetime
+from audio_config import (AudioConfig, SpeculativeOCRConfig, ArchiveConfig, ResultStoreConfig, ImagePreprocessConfig,
+                          AdaptivePresetConfig, EmitConfig, AudioHealthConfig)
+from speculative_ocr import SpeculativeOCRManager
+from asr_backend import load_model_settings, create_recognizer
+from audio_archive import AudioArchiveManager
+from result_store import ResultStore
+from image_preprocess import ImagePreprocessor
+from preset_controller import PresetController
+from stream_recognizer import StreamingRecognizer
+from result_emitter import ResultEmitter
+from audio_health import AudioHealthMonitor
 
 # 初始化Flask应用和SocketIO
 app = Flask(__name__)
@@ -87,6 +98,19 @@ def call_ocr_api(file_path, category, audio_text):
         'file_path': file_path
     }
 
+def run_ocr_pipeline(file_path, category, audio_text):
+    """
+    OCR处理流程：先规范化图像（旋转、缩放、灰度、重新编码），再调用OCR API
+    返回的file_path仍为原始上传文件
+    """
+    preprocess = image_preprocessor.process(file_path) if image_preprocessor else None
+    ocr_input = preprocess['ocr_path'] if preprocess else file_path
+    
+    ocr_result = call_ocr_api(ocr_input, category, audio_text)
+    ocr_result['file_path'] = file_path
+    ocr_result['preprocess'] = preprocess
+    return ocr_result
+
 # 允许的文件类型
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'pdf'}
 
@@ -106,6 +130,11 @@ CHANNELS = 1
 FORMAT = pyaudio.paInt16
 # Web Audio API使用的缓冲区大小（2的幂）
 WEB_BUFFER_SIZE = 16384
+# 浏览器端发送的音频块大小，与桌面端一致（9600样本）
+DESKTOP_CHUNK_SIZE = CHUNK_SIZE_SAMPLES
+
+# 语音识别模型配置（推理后端、线程数等，来自config.json的model_config）
+MODEL_SETTINGS = load_model_settings()
 
 # 模型实例和音频队列字典，用于多用户同时访问
 models = {}
@@ -114,6 +143,80 @@ recorded_texts = {}
 # 跟踪服务器录音状态
 server_recording = {}
 audio_recorders = {}
+# 跟踪录音状态（浏览器端和服务端模式），处理线程据此判断是否继续等待音频
+recording_active = {}
+# 每个会话的滚动音频健康统计
+audio_health = {}
+
+# 流式识别预设：客户端可指定，控制器根据队列延迟和CPU负载在语句边界处切换
+preset_controller = PresetController(
+    base_settings=MODEL_SETTINGS,
+    enabled=AdaptivePresetConfig.ENABLED,
+    sample_interval=AdaptivePresetConfig.SAMPLE_INTERVAL_SECONDS,
+    lag_high=AdaptivePresetConfig.LAG_HIGH_SECONDS,
+    lag_low=AdaptivePresetConfig.LAG_LOW_SECONDS,
+    cpu_high=AdaptivePresetConfig.CPU_HIGH_PERCENT,
+    cpu_low=AdaptivePresetConfig.CPU_LOW_PERCENT,
+    hysteresis_samples=AdaptivePresetConfig.HYSTERESIS_SAMPLES,
+    min_dwell_seconds=AdaptivePresetConfig.MIN_DWELL_SECONDS
+)
+
+# 识别结果发送：按会话合并、限速，由单一发送线程发出
+result_emitter = ResultEmitter(
+    emit=lambda event, data, room: socketio.emit(event, data, room=room),
+    window_seconds=EmitConfig.COALESCE_WINDOW_MS / 1000,
+    max_messages_per_second=EmitConfig.MAX_MESSAGES_PER_SECOND,
+    stats_window_seconds=EmitConfig.STATS_WINDOW_SECONDS
+)
+
+# 推测式OCR：选择文件时即在后台执行OCR，/upload时认领结果
+speculative_ocr = SpeculativeOCRManager(
+    run_job=lambda file_path, category: run_ocr_pipeline(file_path, category, ''),
+    max_workers=SpeculativeOCRConfig.MAX_WORKERS,
+    max_pending=SpeculativeOCRConfig.MAX_PENDING_JOBS,
+    ttl_seconds=SpeculativeOCRConfig.JOB_TTL_SECONDS,
+    confirmed_high_water=SpeculativeOCRConfig.CONFIRMED_HIGH_WATER,
+    claim_timeout=SpeculativeOCRConfig.CLAIM_TIMEOUT_SECONDS,
+    sweep_interval=SpeculativeOCRConfig.SWEEP_INTERVAL_SECONDS
+)
+
+# 会话音频归档（可选）：追加保存原始PCM，用于复现和重新识别
+audio_archive = AudioArchiveManager(
+    archive_dir=ArchiveConfig.ARCHIVE_DIR,
+    max_queued_chunks=ArchiveConfig.WRITE_QUEUE_MAX_CHUNKS,
+    write_buffer_bytes=ArchiveConfig.WRITE_BUFFER_BYTES,
+    max_total_size_mb=ArchiveConfig.MAX_TOTAL_SIZE_MB,
+    max_age_days=ArchiveConfig.MAX_AGE_DAYS
+) if ArchiveConfig.ENABLED else None
+
+# OCR前的图像规范化，派生图像按内容哈希缓存
+image_preprocessor = ImagePreprocessor(
+    cache_dir=ImagePreprocessConfig.CACHE_DIR,
+    target_dpi=ImagePreprocessConfig.TARGET_DPI,
+    page_long_edge_inches=ImagePreprocessConfig.PAGE_LONG_EDGE_INCHES,
+    grayscale=ImagePreprocessConfig.GRAYSCALE,
+    jpeg_quality=ImagePreprocessConfig.JPEG_QUALITY,
+    thumbnail_size=ImagePreprocessConfig.THUMBNAIL_SIZE,
+    max_workers=ImagePreprocessConfig.MAX_WORKERS
+) if ImagePreprocessConfig.ENABLED else None
+
+def create_result_store():
+    """创建OCR结果存储；未启用或SQLite不支持（如缺少FTS5）时返回None"""
+    if not ResultStoreConfig.ENABLED:
+        return None
+    try:
+        return ResultStore(
+            db_path=ResultStoreConfig.DB_PATH,
+            batch_size=ResultStoreConfig.WRITE_BATCH_SIZE,
+            flush_interval=ResultStoreConfig.FLUSH_INTERVAL_SECONDS,
+            max_queued=ResultStoreConfig.WRITE_QUEUE_MAX
+        )
+    except sqlite3.OperationalError as e:
+        print(f"警告: 结果存储初始化失败，已禁用结果存储: {e}")
+        return None
+
+# OCR结果存储：保存每个文档的OCR文本、音频转写和分类，支持全文检索
+result_store = create_result_store()
 
 def allowed_file(filename):
     """检查文件类型是否允许上传"""
@@ -136,17 +239,39 @@ def initialize_model(sid):
     """为每个用户会话初始化模型"""
     if sid not in models:
         try:
-            # 根据实际情况调整模型路径
-            models[sid] = AutoModel(model="E:\Huggingface\models\paraformer-zh-streaming", disable_update=True)
+            # 按配置选择推理后端（PyTorch / ONNX / int8量化ONNX）
+            models[sid] = create_recognizer(MODEL_SETTINGS)
             audio_queues[sid] = queue.Queue()
             recorded_texts[sid] = ""
             server_recording[sid] = False
+            recording_active[sid] = False
             return True
         except Exception as e:
             print(f"模型加载失败: {e}")
             return False
     return True
 
+def track_audio_health(sid, audio_data, source, received_samples=None, track_drift=True):
+    """
+    更新会话的音频健康统计，返回该块的(rms, peak)
+    received_samples/track_drift见AudioHealthMonitor.update
+    每LOG_INTERVAL块输出一次日志，每AUDIO_QUALITY_REPORT_INTERVAL块（或告警变化时）向客户端发送audio_quality报告
+    """
+    monitor = audio_health.get(sid)
+    if monitor is None:
+        return 0.0, float(np.max(np.abs(audio_data))) if audio_data.size else 0.0
+    
+    rms, peak = monitor.update(audio_data, received_samples=received_samples, track_drift=track_drift)
+    if (monitor.chunks - 1) % AudioConfig.LOG_INTERVAL == 0:
+        print(f"{source}: 长度={len(audio_data)}, 峰值={peak:.4f}, RMS={rms:.6f}")
+    
+    report = monitor.report_due(AudioConfig.AUDIO_QUALITY_REPORT_INTERVAL)
+    if report is not None:
+        if report['warnings']:
+            print(f"会话 {sid} 音频质量告警: {', '.join(report['warnings'])}")
+        socketio.emit('audio_quality', report, room=sid)
+    return rms, peak
+
 def audio_recorder_thread(sid):
     """服务端录音线程"""
     if sid not in server_recording or sid not in audio_queues or sid not in models:
@@ -173,18 +298,15 @@ def audio_recorder_thread(sid):
                 # 转换为float32格式，与桌面端保持一致
                 audio_data = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
                 
-                # 输出调试信息
-                if not hasattr(audio_recorder_thread, 'log_counter'):
-                    audio_recorder_thread.log_counter = 0
-                if audio_recorder_thread.log_counter % 10 == 0:
-                    rms = np.sqrt(np.mean(audio_data ** 2))
-                    min_val = np.min(audio_data)
-                    max_val = np.max(audio_data)
-                    print(f"服务端录音: 长度={len(audio_data)}, 范围=[{min_val:.4f}, {max_val:.4f}], RMS={rms:.6f}")
-                audio_recorder_thread.log_counter += 1
+                # 更新音频健康统计并输出调试信息
+                track_audio_health(sid, audio_data, '服务端录音')
+                
+                # 放入队列（附带入队时间，用于计算处理延迟）
+                audio_queues[sid].put((audio_data, time.time()))
                 
-                # 放入队列
-                audio_queues[sid].put(audio_data)
+                # 归档原始int16数据（非阻塞）
+                if audio_archive:
+                    audio_archive.append(sid, np.frombuffer(data, dtype=np.int16))
                 
             except Exception as e:
                 print(f"服务端录音错误: {e}")
@@ -212,45 +334,55 @@ def audio_recorder_thread(sid):
                 
         print(f"服务端录音线程已终止 - 会话 {sid}")
 
+def emit_recognition_result(sid, text, produced_at=None):
+    """提交识别结果，由发送器合并后通过WebSocket发送给客户端"""
+    recorded_texts[sid] += text + " "
+    result_emitter.submit(sid, text, produced_at)
+
+def switch_preset(sid, preset, sample_offset):
+    """会话在语句边界处切换预设：先发出旧预设下的结果，再记录切换并通知客户端"""
+    result_emitter.flush(sid)
+    previous = preset_controller.apply_switch(sid, preset)
+    # 记录切换点，重放时在相同位置切换
+    if audio_archive:
+        audio_archive.record_preset_switch(sid, sample_offset, preset)
+    socketio.emit('preset_changed', {'preset': preset, 'previous': previous}, room=sid)
+
 def process_audio(sid):
     """音频处理函数"""
     if sid not in models or sid not in audio_queues:
         return
-        
-    cache = {}
-    chunk_count = 0
+    
+    # 按当前预设的识别块长度重新切分接收到的音频，在语句边界处应用控制器要求的预设切换
+    stream = StreamingRecognizer(
+        models[sid], MODEL_SETTINGS, preset_controller.active_preset(sid),
+        pending_switch=lambda: preset_controller.pending_switch(sid),
+        on_result=lambda text, produced_at: emit_recognition_result(sid, text, produced_at),
+        on_switch=lambda previous, preset, sample_offset: switch_preset(sid, preset, sample_offset),
+        noise_margin=AdaptivePresetConfig.BOUNDARY_NOISE_MARGIN,
+        max_defer_blocks=AdaptivePresetConfig.MAX_SWITCH_DEFER_BLOCKS,
+        verbose=True
+    )
     
     try:
-        while server_recording.get(sid, False) or not audio_queues[sid].empty():
+        while recording_active.get(sid, False) or not audio_queues[sid].empty():
             try:
                 # 从队列获取音频数据
-                speech_chunk = audio_queues[sid].get(timeout=1.0)
+                item = audio_queues[sid].get(timeout=1.0)
                 
-                if speech_chunk is None:  # 结束信号
+                if item is None:  # 结束信号
                     break
                 
-                chunk_count += 1
-                print(f"处理音频块 {chunk_count}, 形状={speech_chunk.shape}")
-                    
-                # 使用与桌面端完全一致的参数处理音频块
-                res = models[sid].generate(
-                    input=speech_chunk,
-                    cache=cache,
-                    is_final=False,
-                    chunk_size=[0, 10, 5],
-                    encoder_chunk_look_back=4,
-                    decoder_chunk_look_back=1
-                )
-                
-                if res and len(res) > 0:
-                    text = res[0].get('text', '')
-                    if text.strip():
-                        # 将识别结果通过WebSocket发送给客户端
-                        recorded_texts[sid] += text + " "
-                        socketio.emit('recognition_result', {'text': text}, room=sid)
+                audio_data, enqueued_at = item
+                stream.feed(audio_data, enqueued_at)
+                preset_controller.report_lag(sid, time.time() - enqueued_at)
                 
             except queue.Empty:
                 continue
+        
+        # 录音结束，识别剩余音频并输出最后的结果
+        stream.finish()
+        result_emitter.flush(sid)
                 
     except Exception as e:
         print(f"音频处理错误: {e}")
@@ -283,10 +415,8 @@ def upload_file():
         return jsonify({'status': 'error', 'message': '不支持的文件类型'}), 400
     
     try:
-        # 保存上传文件
+        start_time = time.time()
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
         
         # 获取表单数据
         metadata = request.form.get('metadata', '{}')
@@ -294,6 +424,7 @@ def upload_file():
         
         category = metadata_dict.get('category', auto_categorize_file(filename))
         audio_text = metadata_dict.get('audio_text', '')
+        speculative_token = metadata_dict.get('speculative_token')
         
         # 打印接收到的数据
         print("接收到的OCR处理请求数据:")
@@ -302,17 +433,56 @@ def upload_file():
         print(f"音频文本: {audio_text}")
         print(f"元数据: {json.dumps(metadata_dict, ensure_ascii=False, indent=2)}")
         
-        # 调用OCR API处理文件
-        print("开始OCR处理...")
-        ocr_result = call_ocr_api(filepath, category, audio_text)
+        # 优先认领选择文件时启动的推测式OCR结果
+        ocr_start = time.time()
+        ocr_result = None
+        speculative_hit = False
+        if speculative_token:
+            ocr_result = speculative_ocr.claim(speculative_token, filename)
+            if ocr_result is not None:
+                print(f"已认领推测式OCR结果: {speculative_token}")
+                ocr_result = dict(ocr_result, category=category, audio_text=audio_text)
+                speculative_hit = True
+        
+        if ocr_result is None:
+            # 保存上传文件
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            file.save(filepath)
+            
+            # 调用OCR API处理文件
+            print("开始OCR处理...")
+            with speculative_ocr.confirmed_job():
+                ocr_result = run_ocr_pipeline(filepath, category, audio_text)
+        
+        ocr_seconds = time.time() - ocr_start
+        preprocess = ocr_result.get('preprocess')
+        
+        # 保存处理结果以便检索（后台批量写入，不阻塞上传）
+        if result_store:
+            result_store.add({
+                'file_hash': preprocess['content_hash'] if preprocess else None,
+                'filename': filename,
+                'file_path': ocr_result['file_path'],
+                'category': category,
+                'audio_text': audio_text,
+                'ocr_text': ocr_result['ocr_result'],
+                'timings': {
+                    'ocr_seconds': round(ocr_seconds, 3),
+                    'total_seconds': round(time.time() - start_time, 3),
+                    'speculative': speculative_hit
+                }
+            })
         
         # 返回处理结果
         result = {
             'status': ocr_result['status'],
-            'processing_time': '2.0秒',  # 实际应该计算处理时间
+            'processing_time': f'{time.time() - start_time:.1f}秒',
             'result': ocr_result['ocr_result'],  # 只返回格式化后的OCR文本
             'category': ocr_result['category'],
-            'file_path': ocr_result['file_path']
+            'file_path': ocr_result['file_path'],
+            'speculative': speculative_hit,
+            'thumbnail_url': url_for('get_thumbnail', cache_key=preprocess['cache_key'], _external=True)
+                             if preprocess and preprocess['thumbnail_path'] else None
         }
         
         print(f"OCR处理完成，结果长度: {len(result['result'])}")
@@ -324,6 +494,118 @@ def upload_file():
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/prefetch', methods=['POST'])
+def prefetch_file():
+    """选择文件时预先上传并启动推测式OCR"""
+    if not SpeculativeOCRConfig.ENABLED:
+        return jsonify({'status': 'error', 'message': '推测式OCR未启用'}), 403
+    
+    if 'file' not in request.files:
+        return jsonify({'status': 'error', 'message': '没有文件上传'}), 400
+        
+    file = request.files['file']
+    
+    if not file or file.filename == '' or not allowed_file(file.filename):
+        return jsonify({'status': 'error', 'message': '不支持的文件类型'}), 400
+    
+    try:
+        filename = secure_filename(file.filename)
+        client_id = request.form.get('client_id', '')
+        
+        # 推测任务的文件单独存放，避免与确认上传的同名文件冲突
+        speculative_folder = os.path.join(app.config['UPLOAD_FOLDER'], SpeculativeOCRConfig.UPLOAD_SUBFOLDER)
+        os.makedirs(speculative_folder, exist_ok=True)
+        filepath = os.path.join(speculative_folder, f"{int(time.time() * 1000)}_{filename}")
+        file.save(filepath)
+        
+        token = speculative_ocr.submit(client_id, filename, filepath, auto_categorize_file(filename))
+        if token is None:
+            os.remove(filepath)
+            return jsonify({'status': 'skipped', 'message': '推测式OCR预算已满'})
+        
+        return jsonify({'status': 'accepted', 'token': token})
+        
+    except Exception as e:
+        print(f"推测式OCR预取失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/prefetch/<token>', methods=['DELETE'])
+def cancel_prefetch(token):
+    """取消推测式OCR任务"""
+    if speculative_ocr.cancel(token):
+        return jsonify({'status': 'cancelled'})
+    return jsonify({'status': 'error', 'message': '任务不存在'}), 404
+
+@app.route('/thumbnail/<cache_key>')
+def get_thumbnail(cache_key):
+    """返回规范化阶段生成的缩略图"""
+    if not image_preprocessor:
+        return jsonify({'status': 'error', 'message': '图像规范化未启用'}), 404
+    return send_from_directory(os.path.abspath(image_preprocessor.cache_dir), f"{secure_filename(cache_key)}_thumb.jpg")
+
+@app.route('/results/search')
+def search_results():
+    """全文检索已处理文档的OCR文本和音频转写"""
+    if not result_store:
+        return jsonify({'status': 'error', 'message': '结果存储未启用'}), 404
+    
+    query = request.args.get('q', '').strip()
+    category = request.args.get('category') or None
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        page_size = int(request.args.get('page_size', ResultStoreConfig.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': '分页参数无效'}), 400
+    page_size = min(max(1, page_size), ResultStoreConfig.MAX_PAGE_SIZE)
+    
+    try:
+        total, items = result_store.search(query, category, page, page_size)
+    except Exception as e:
+        print(f"检索结果时出错: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    
+    return jsonify({
+        'status': 'success',
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'items': items
+    })
+
+@app.route('/results/<int:doc_id>')
+def get_result(doc_id):
+    """按ID查询已处理文档"""
+    if not result_store:
+        return jsonify({'status': 'error', 'message': '结果存储未启用'}), 404
+    
+    record = result_store.get(doc_id)
+    if record is None:
+        return jsonify({'status': 'error', 'message': '记录不存在'}), 404
+    return jsonify({'status': 'success', 'item': record})
+
+@app.route('/results/hash/<file_hash>')
+def get_results_by_hash(file_hash):
+    """按文件哈希查询已处理文档"""
+    if not result_store:
+        return jsonify({'status': 'error', 'message': '结果存储未启用'}), 404
+    
+    return jsonify({'status': 'success', 'items': result_store.find_by_hash(file_hash)})
+
+@app.route('/metrics')
+def metrics():
+    """运行指标"""
+    return jsonify({
+        'speculative_ocr': speculative_ocr.stats(),
+        'audio_archive': audio_archive.stats() if audio_archive else None,
+        'result_store': result_store.stats() if result_store else None,
+        'image_preprocess': image_preprocessor.stats() if image_preprocessor else None,
+        'presets': preset_controller.stats(),
+        'emitter': result_emitter.stats(),
+        'audio_health': {sid: monitor.report() for sid, monitor in list(audio_health.items())}
+    })
+
 @socketio.on('connect')
 def handle_connect():
     """处理WebSocket连接"""
@@ -341,9 +623,20 @@ def handle_disconnect():
     sid = request.sid
     
     # 清理资源
+    recording_active.pop(sid, None)
     if sid in audio_queues:
         audio_queues[sid].put(None)  # 发送结束信号
     
+    # 取消未认领的推测式OCR任务
+    speculative_ocr.cancel_client(sid)
+    
+    # 结束未关闭的音频归档
+    if audio_archive:
+        audio_archive.close_session(sid)
+    preset_controller.unregister(sid)
+    result_emitter.discard(sid)
+    audio_health.pop(sid, None)
+    
     # 删除会话相关资源
     if sid in models:
         del models[sid]
@@ -361,10 +654,31 @@ def handle_start_recording(data=None):
     
     # 获取录音模式 - 'browser' 或 'server'
     mode = data.get('mode', 'browser') if data else 'browser'
-    print(f"开始录音 - 模式: {mode}")
+    # 流式识别预设 - 'low_latency'、'balanced'、'high_accuracy'，未指定时使用config.json参数
+    preset = preset_controller.register(sid, data.get('preset') if data else None)
+    print(f"开始录音 - 模式: {mode}, 预设: {preset}")
     
     # 清空之前的录音文本
     recorded_texts[sid] = ""
+    recording_active[sid] = True
+    
+    # 每次录音重新开始音频健康统计
+    audio_health[sid] = AudioHealthMonitor(
+        sample_rate=SAMPLE_RATE,
+        clip_threshold=AudioHealthConfig.CLIP_THRESHOLD,
+        dropout_rms=AudioHealthConfig.DROPOUT_RMS,
+        max_clip_ratio=AudioHealthConfig.MAX_CLIP_RATIO,
+        max_dc_offset=AudioHealthConfig.MAX_DC_OFFSET,
+        min_rms=AudioConfig.MIN_ENERGY_THRESHOLD,
+        max_drift_ppm=AudioHealthConfig.MAX_DRIFT_PPM,
+        max_dropout_ratio=AudioHealthConfig.MAX_DROPOUT_RATIO,
+        dropout_min_chunks=AudioHealthConfig.DROPOUT_MIN_CHUNKS,
+        smoothing=AudioHealthConfig.SMOOTHING
+    )
+    
+    # 开始本次录音的音频归档
+    if audio_archive:
+        audio_archive.open_session(sid, SAMPLE_RATE, preset)
     
     if mode == 'server':
         # 服务端录音模式
@@ -387,12 +701,12 @@ def handle_start_recording(data=None):
         )
         process_thread.start()
         
-        emit('recording_status', {'status': 'started', 'mode': 'server'})
+        emit('recording_status', {'status': 'started', 'mode': 'server', 'preset': preset})
     else:
         # 浏览器录音模式 (原有功能)
         # 启动音频处理线程
         threading.Thread(target=process_audio, args=(sid,), daemon=True).start()
-        emit('recording_status', {'status': 'started', 'mode': 'browser'})
+        emit('recording_status', {'status': 'started', 'mode': 'browser', 'preset': preset})
 
 @socketio.on('stop_recording')
 def handle_stop_recording(data=None):
@@ -402,6 +716,7 @@ def handle_stop_recording(data=None):
     # 获取录音模式
     mode = data.get('mode', 'browser') if data else 'browser'
     print(f"停止录音 - 模式: {mode}")
+    recording_active[sid] = False
     
     if mode == 'server' and sid in server_recording:
         # 停止服务端录音
@@ -420,6 +735,13 @@ def handle_stop_recording(data=None):
         if sid in audio_queues:
             audio_queues[sid].put(None)  # 发送结束信号
     
+    # 结束本次录音的音频归档
+    if audio_archive:
+        audio_archive.close_session(sid)
+    
+    # 会话不再参与负载自适应
+    preset_controller.unregister(sid)
+    
     # 返回完整的录音文本
     if sid in recorded_texts:
         emit('recording_complete', {'text': recorded_texts[sid]})
@@ -434,6 +756,7 @@ def handle_clear_recording():
     # 确保录音已停止
     if sid in server_recording and server_recording[sid]:
         server_recording[sid] = False
+    recording_active[sid] = False
     
     if sid in recorded_texts:
         recorded_texts[sid] = ""
@@ -445,14 +768,13 @@ def handle_audio_data(data):
     """处理音频数据"""
     sid = request.sid
     
-    if sid not in audio_queues:
+    # 未在录音时不接收音频，避免音频在队列中堆积到下一次录音
+    if sid not in audio_queues or not recording_active.get(sid, False):
         return
     
     try:
         # 解析Base64音频数据
         audio_bytes = base64.b64decode(data['audio'])
-        buffer_size = data.get('bufferSize', DESKTOP_CHUNK_SIZE)
-        expected_chunk_size = data.get('expectedChunkSize', DESKTOP_CHUNK_SIZE)
         
         # 前端发送的是Float32Array格式的音频数据（已经归一化到[-1.0, 1.0]范围）
         audio_data = np.frombuffer(audio_bytes, dtype=np.float32)
@@ -462,11 +784,17 @@ def handle_audio_data(data):
             print(f"警告: 收到空的音频数据")
             return
         
+        # 更新音频健康统计（在归一化和补零之前，反映麦克风的真实情况）
+        # 浏览器每次采集的样本多于发送的样本，按实际采集数估计采样率漂移；旧版页面未上报时不估计
+        captured_samples = data.get('capturedSamples')
+        _, peak = track_audio_health(sid, audio_data, '接收音频数据',
+                                     received_samples=captured_samples,
+                                     track_drift=captured_samples is not None)
+        
         # 验证音频数据范围
-        max_abs = np.max(np.abs(audio_data))
-        if max_abs > 1.0:
-            print(f"警告: 音频数据超出范围 [-1.0, 1.0], max_abs={max_abs:.4f}, 进行归一化")
-            audio_data = audio_data / max_abs
+        if peak > 1.0:
+            print(f"警告: 音频数据超出范围 [-1.0, 1.0], max_abs={peak:.4f}, 进行归一化")
+            audio_data = audio_data / peak
         
         # 确保音频数据长度与桌面端一致（9600样本）
         if audio_data.size != DESKTOP_CHUNK_SIZE:
@@ -481,20 +809,12 @@ def handle_audio_data(data):
                 audio_data = audio_data[:DESKTOP_CHUNK_SIZE]
             print(f"已调整音频块大小到: {audio_data.size}")
         
-        # 计算音频质量指标
-        rms = np.sqrt(np.mean(audio_data ** 2))
-        min_val = np.min(audio_data)
-        max_val = np.max(audio_data)
-            
-        # 添加调试信息（每10次只输出一次，避免日志过多）
-        if not hasattr(handle_audio_data, 'log_counter'):
-            handle_audio_data.log_counter = 0
-        if handle_audio_data.log_counter % 10 == 0:
-            print(f"接收音频数据: 形状={audio_data.shape}, 范围=[{min_val:.4f}, {max_val:.4f}], RMS={rms:.6f}, 期望块大小={expected_chunk_size}")
-        handle_audio_data.log_counter += 1
+        # 将音频数据放入队列（附带入队时间，用于计算处理延迟）
+        audio_queues[sid].put((audio_data, time.time()))
         
-        # 将音频数据放入队列
-        audio_queues[sid].put(audio_data)
+        # 归档音频数据（非阻塞）
+        if audio_archive:
+            audio_archive.append(sid, audio_data)
         
     except Exception as e:
         print(f"音频数据处理错误: {e}")
@@ -517,7 +837,10 @@ def handle_check_file(data):
     """检查文件并返回自动分类结果"""
     filename = data.get('filename', '')
     category = auto_categorize_file(filename)
-    emit('file_category', {'category': category})
+    emit('file_category', {
+        'category': category,
+        'speculative': SpeculativeOCRConfig.ENABLED
+    })
 
 @socketio.on('update_recognition_text')
 def handle_update_recognition_text(data):
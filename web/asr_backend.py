@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音识别推理后端
+根据ModelConfig / config.json中的model_config选择推理后端：
+- pytorch: FunASR AutoModel默认推理路径
+- onnx: 导出的ONNX Runtime计算图
+- onnx_int8: int8量化的ONNX Runtime计算图
+各后端提供与AutoModel.generate一致的流式识别接口
+"""
+
+import os
+import json
+
+from audio_config import ModelConfig
+
+BACKENDS = ('pytorch', 'onnx', 'onnx_int8')
+
+# 默认配置文件路径（项目根目录下的config.json）
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+
+def load_model_settings(config_path=DEFAULT_CONFIG_PATH):
+    """
+    加载模型配置
+    以ModelConfig为默认值，使用config.json中model_config的同名字段覆盖
+    """
+    settings = {
+        'model_path': ModelConfig.MODEL_PATH,
+        'backend': ModelConfig.BACKEND,
+        'use_gpu': ModelConfig.USE_GPU,
+        'disable_update': ModelConfig.DISABLE_UPDATE,
+        'intra_op_threads': ModelConfig.INTRA_OP_THREADS,
+        'inter_op_threads': ModelConfig.INTER_OP_THREADS,
+        'chunk_size': [0, 10, 5],
+        'encoder_chunk_look_back': 4,
+        'decoder_chunk_look_back': 1,
+    }
+
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        settings.update(config.get('model_config', {}))
+    except Exception as e:
+        print(f"加载配置文件失败，使用默认模型配置: {e}")
+
+    if settings['backend'] not in BACKENDS:
+        raise ValueError(f"不支持的推理后端: {settings['backend']}，可选: {', '.join(BACKENDS)}")
+
+    return settings
+
+
+class PytorchRecognizer:
+    """FunASR AutoModel (PyTorch) 推理后端"""
+
+    name = 'pytorch'
+    # 每次调用都可以指定chunk_size和回望参数
+    dynamic_chunking = True
+
+    def __init__(self, settings):
+        import torch
+        from funasr import AutoModel
+
+        if settings.get('inter_op_threads'):
+            try:
+                torch.set_num_interop_threads(settings['inter_op_threads'])
+            except RuntimeError:
+                # 进程内已有并行任务运行后不能再修改inter-op线程数
+                pass
+
+        self.model = AutoModel(
+            model=settings['model_path'],
+            disable_update=settings['disable_update'],
+            device='cuda' if settings['use_gpu'] else 'cpu',
+            ncpu=settings['intra_op_threads']
+        )
+
+    def generate(self, speech_chunk, cache, is_final, chunk_size,
+                 encoder_chunk_look_back, decoder_chunk_look_back):
+        return self.model.generate(
+            input=speech_chunk,
+            cache=cache,
+            is_final=is_final,
+            chunk_size=chunk_size,
+            encoder_chunk_look_back=encoder_chunk_look_back,
+            decoder_chunk_look_back=decoder_chunk_look_back
+        )
+
+
+class OnnxRecognizer:
+    """
+    ONNX Runtime推理后端（funasr_onnx）
+    chunk_size在加载时固定；回望参数已固化在导出的计算图中，调用时忽略。
+    流式模型按顺序执行，inter-op线程数对其没有影响，仅intra-op线程数生效
+    """
+
+    dynamic_chunking = False
+
+    def __init__(self, settings, quantize=False):
+        from funasr_onnx.paraformer_online_bin import Paraformer
+
+        self.name = 'onnx_int8' if quantize else 'onnx'
+        self.model = Paraformer(
+            settings['model_path'],
+            batch_size=1,
+            chunk_size=settings['chunk_size'],
+            device_id='0' if settings['use_gpu'] else '-1',
+            quantize=quantize,
+            intra_op_num_threads=settings['intra_op_threads']
+        )
+
+    def generate(self, speech_chunk, cache, is_final, chunk_size=None,
+                 encoder_chunk_look_back=None, decoder_chunk_look_back=None):
+        res = self.model(audio_in=speech_chunk, param_dict={'cache': cache, 'is_final': is_final})
+        # 转换为与AutoModel一致的输出格式
+        results = []
+        for item in res:
+            preds = item.get('preds', '')
+            text = preds[0] if isinstance(preds, (list, tuple)) else preds
+            results.append({'text': text})
+        return results
+
+
+def create_recognizer(settings):
+    """根据配置创建推理后端"""
+    backend = settings['backend']
+    print(f"加载语音识别模型: 后端={backend}, 路径={settings['model_path']}, "
+          f"intra_op={settings['intra_op_threads']}, inter_op={settings['inter_op_threads']}")
+
+    if backend == 'pytorch':
+        return PytorchRecognizer(settings)
+    return OnnxRecognizer(settings, quantize=(backend == 'onnx_int8'))
+
+
+def recognize_chunk(recognizer, speech_chunk, cache, is_final, settings):
+    """使用配置中的流式参数识别一个音频块"""
+    return recognizer.generate(
+        speech_chunk,
+        cache=cache,
+        is_final=is_final,
+        chunk_size=settings['chunk_size'],
+        encoder_chunk_look_back=settings['encoder_chunk_look_back'],
+        decoder_chunk_look_back=settings['decoder_chunk_look_back']
+    )
+
+
+def export_model(settings, backend):
+    """
+    一次性导出/转换模型
+    在模型目录下生成ONNX计算图（onnx_int8同时生成量化版本）
+    """
+    if backend not in ('onnx', 'onnx_int8'):
+        raise ValueError(f"只能导出ONNX后端: {backend}")
+
+    from funasr import AutoModel
+
+    print(f"正在导出模型: {settings['model_path']} -> {backend}")
+    model = AutoModel(model=settings['model_path'], disable_update=settings['disable_update'], device='cpu')
+    output_dir = model.export(type='onnx', quantize=(backend == 'onnx_int8'))
+    print(f"✓ 模型导出完成: {output_dir}")
+    return output_dir
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话音频归档
+在音频接收路径中把每个会话的原始int16 PCM和音频块索引追加写入磁盘，
+用于复现识别问题或使用新模型重新识别历史会话
+
+每个会话一个目录:
+    audio.pcm   原始int16 PCM（小端、单声道）
+    index.bin   音频块索引（INDEX_DTYPE定长记录）
+    meta.json   会话信息（含识别预设和预设切换点，重放时使用相同参数）
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import threading
+import numpy as np
+
+from preset_controller import DEFAULT_PRESET
+from stream_recognizer import StreamingRecognizer
+
+# 音频块索引记录：起始样本偏移、样本数、接收时间戳
+INDEX_DTYPE = np.dtype([('offset', '<i8'), ('samples', '<i4'), ('timestamp', '<f8')])
+
+PCM_FILE = 'audio.pcm'
+INDEX_FILE = 'index.bin'
+META_FILE = 'meta.json'
+
+
+class _SessionFiles:
+    """写入线程持有的单个会话文件句柄"""
+
+    def __init__(self, session_dir, buffer_bytes):
+        self.session_dir = session_dir
+        # 每个会话目录只写入一次，文件已存在说明会话ID冲突，不能追加到其他会话的音频后面
+        self.pcm = open(os.path.join(session_dir, PCM_FILE), 'xb', buffering=buffer_bytes)
+        self.index = open(os.path.join(session_dir, INDEX_FILE), 'xb')
+        self.samples = 0
+        self.chunks = 0
+        self.preset_switches = []  # [(样本偏移, 预设)]
+
+    def close(self):
+        self.pcm.close()
+        self.index.close()
+
+
+class AudioArchiveManager:
+    """
+    会话音频归档管理器
+
+    接收路径只把音频块放入队列，由单独的写入线程落盘；
+    排队的音频块数有上限，超过时丢弃该块并计数。会话的打开/关闭消息不受上限约束，
+    与音频块共用同一队列以保持顺序，保证归档永远不会阻塞识别
+    """
+
+    def __init__(self, archive_dir, max_queued_chunks=256, write_buffer_bytes=256 * 1024,
+                 max_total_size_mb=1024, max_age_days=7):
+        self.archive_dir = archive_dir
+        self._write_buffer_bytes = write_buffer_bytes
+        self._max_total_bytes = max_total_size_mb * 1024 * 1024
+        self._max_age_seconds = max_age_days * 24 * 3600
+
+        self._max_queued_chunks = max_queued_chunks
+        self._queue = queue.Queue()
+        self._queued_chunks = 0
+        self._active = {}  # sid -> session_id
+        self._dropped = {}  # session_id -> 丢弃的块数
+        self._dropped_total = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(archive_dir, exist_ok=True)
+        writer = threading.Thread(target=self._writer_loop, daemon=True)
+        writer.start()
+        self._queue.put(('retention', None, None, None))
+
+    def open_session(self, sid, sample_rate, preset=DEFAULT_PRESET):
+        """为会话开始新的归档，返回归档会话ID"""
+        # 同一连接可能在一秒内开始多次录音，附加随机后缀保证会话目录唯一
+        session_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{sid[:8]}_{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            self._active[sid] = session_id
+            self._dropped[session_id] = 0
+        meta = {
+            'session_id': session_id,
+            'sid': sid,
+            'sample_rate': sample_rate,
+            'preset': preset,
+            'started_at': time.time()
+        }
+        # 会话的打开/关闭也经过队列，保证与音频块顺序一致
+        self._queue.put(('open', session_id, meta, None))
+        return session_id
+
+    def append(self, sid, audio_chunk):
+        """
+        追加音频块（int16或归一化的float32），不会阻塞
+        返回是否成功进入写入队列
+        """
+        with self._lock:
+            session_id = self._active.get(sid)
+        if session_id is None:
+            return False
+
+        with self._lock:
+            if self._queued_chunks >= self._max_queued_chunks:
+                self._dropped[session_id] = self._dropped.get(session_id, 0) + 1
+                self._dropped_total += 1
+                return False
+            self._queued_chunks += 1
+        self._queue.put(('chunk', session_id, audio_chunk, time.time()))
+        return True
+
+    def record_preset_switch(self, sid, sample_offset, preset):
+        """记录会话在识别到sample_offset个样本处切换了预设"""
+        with self._lock:
+            session_id = self._active.get(sid)
+        if session_id is not None:
+            self._queue.put(('preset', session_id, (sample_offset, preset), None))
+
+    def close_session(self, sid):
+        """结束会话归档"""
+        with self._lock:
+            session_id = self._active.pop(sid, None)
+        if session_id is not None:
+            self._queue.put(('close', session_id, None, None))
+
+    def stats(self):
+        """返回统计信息"""
+        with self._lock:
+            return {
+                'active_sessions': len(self._active),
+                'queued_chunks': self._queued_chunks,
+                'dropped_chunks': self._dropped_total
+            }
+
+    def _writer_loop(self):
+        """写入线程：按顺序处理打开、追加、关闭和保留策略"""
+        files = {}
+        while True:
+            kind, session_id, payload, timestamp = self._queue.get()
+            if kind == 'chunk':
+                with self._lock:
+                    self._queued_chunks -= 1
+            try:
+                if kind == 'chunk':
+                    session = files.get(session_id)
+                    if session is not None:
+                        self._write_chunk(session, payload, timestamp)
+                elif kind == 'preset':
+                    session = files.get(session_id)
+                    if session is not None:
+                        session.preset_switches.append(payload)
+                elif kind == 'open':
+                    session_dir = os.path.join(self.archive_dir, session_id)
+                    os.makedirs(session_dir, exist_ok=True)
+                    self._write_meta(session_dir, payload)
+                    files[session_id] = _SessionFiles(session_dir, self._write_buffer_bytes)
+                elif kind == 'close':
+                    session = files.pop(session_id, None)
+                    if session is not None:
+                        session.close()
+                        with self._lock:
+                            dropped = self._dropped.pop(session_id, 0)
+                        self._finish_meta(session, dropped)
+                    self._enforce_retention(active=set(files))
+                elif kind == 'retention':
+                    self._enforce_retention(active=set(files))
+            except Exception as e:
+                print(f"音频归档写入错误: {e}")
+
+    @staticmethod
+    def _write_chunk(session, audio_chunk, timestamp):
+        if audio_chunk.dtype != np.int16:
+            audio_chunk = np.clip(audio_chunk * 32768.0, -32768, 32767).astype(np.int16)
+        pcm = audio_chunk.astype('<i2', copy=False)
+        session.pcm.write(pcm.tobytes())
+
+        record = np.array([(session.samples, pcm.size, timestamp)], dtype=INDEX_DTYPE)
+        session.index.write(record.tobytes())
+        session.samples += pcm.size
+        session.chunks += 1
+
+    @staticmethod
+    def _write_meta(session_dir, meta):
+        with open(os.path.join(session_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def _finish_meta(self, session, dropped):
+        meta_path = os.path.join(session.session_dir, META_FILE)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        meta.update({
+            'ended_at': time.time(),
+            'chunks': session.chunks,
+            'samples': session.samples,
+            'dropped_chunks': dropped,
+            'preset_switches': session.preset_switches
+        })
+        self._write_meta(session.session_dir, meta)
+
+    def _enforce_retention(self, active):
+        """按存档时长和总大小删除最旧的会话（跳过正在写入的会话）"""
+        now = time.time()
+        sessions = []
+        for name in os.listdir(self.archive_dir):
+            session_dir = os.path.join(self.archive_dir, name)
+            if name in active or not os.path.isdir(session_dir):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(session_dir) if entry.is_file())
+            sessions.append((os.path.getmtime(session_dir), size, session_dir))
+
+        sessions.sort()
+        total = sum(size for _, size, _ in sessions)
+        for mtime, size, session_dir in sessions:
+            if now - mtime <= self._max_age_seconds and total <= self._max_total_bytes:
+                break
+            shutil.rmtree(session_dir, ignore_errors=True)
+            total -= size
+            print(f"音频归档已按保留策略删除: {os.path.basename(session_dir)}")
+
+
+def list_sessions(archive_dir):
+    """列出已归档的会话（按开始时间排序）"""
+    if not os.path.isdir(archive_dir):
+        return []
+    sessions = []
+    for name in os.listdir(archive_dir):
+        meta_path = os.path.join(archive_dir, name, META_FILE)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                sessions.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(sessions, key=lambda m: m.get('started_at', 0))
+
+
+def load_session(archive_dir, session_id):
+    """以内存映射方式加载归档会话，返回(pcm, index, meta)"""
+    session_dir = os.path.join(archive_dir, session_id)
+    with open(os.path.join(session_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    index = np.fromfile(os.path.join(session_dir, INDEX_FILE), dtype=INDEX_DTYPE)
+
+    pcm_path = os.path.join(session_dir, PCM_FILE)
+    if os.path.getsize(pcm_path) == 0:
+        pcm = np.zeros(0, dtype='<i2')
+    else:
+        pcm = np.memmap(pcm_path, dtype='<i2', mode='r')
+    return pcm, index, meta
+
+
+def replay_session(archive_dir, session_id, recognizer, base_settings):
+    """
+    以最快速度把归档会话送入与实时识别相同的流式识别流程，
+    使用会话记录的识别预设并在相同位置切换预设
+    返回(识别文本, 实时率RTF)
+    """
+    pcm, index, meta = load_session(archive_dir, session_id)
+    sample_rate = meta.get('sample_rate', 16000)
+    if meta.get('dropped_chunks'):
+        print(f"警告: 会话归档时丢弃了{meta['dropped_chunks']}个音频块，重放结果可能与实时识别不同")
+
+    texts = []
+    stream = StreamingRecognizer(
+        recognizer, base_settings, meta.get('preset', DEFAULT_PRESET),
+        schedule=meta.get('preset_switches', []),
+        on_result=lambda text, produced_at: texts.append(text)
+    )
+    start = time.perf_counter()
+    for record in index:
+        offset, samples = int(record['offset']), int(record['samples'])
+        stream.feed(pcm[offset:offset + samples].astype(np.float32) / 32768.0)
+    stream.finish()
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = len(pcm) / sample_rate
+    rtf = elapsed / audio_seconds if audio_seconds > 0 else 0.0
+    return ' '.join(texts), rtf
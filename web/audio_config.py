@@ -63,6 +63,14 @@ class ModelConfig:
     
     # 批处理参数
     BATCH_SIZE = 1  # 流式识别通常使用1
+    
+    # 推理后端: 'pytorch'（默认）、'onnx'（导出的ONNX图）、'onnx_int8'（int8量化ONNX图）
+    # ONNX后端需先执行 python web_launcher.py --export onnx 或 --export onnx_int8
+    BACKEND = "pytorch"
+    
+    # CPU线程配置
+    INTRA_OP_THREADS = 4  # 单个算子内部的并行线程数
+    INTER_OP_THREADS = 1  # 算子之间的并行线程数（仅PyTorch后端生效）
 
 class PerformanceConfig:
     """性能优化配置"""
@@ -75,6 +83,84 @@ class PerformanceConfig:
     MAX_BUFFER_SIZE_MB = 50
     CLEANUP_INTERVAL = 300  # 清理间隔（秒）
 
+class SpeculativeOCRConfig:
+    """推测式OCR配置（选择文件时即开始OCR）"""
+    
+    ENABLED = False                 # 是否启用推测式OCR（默认关闭）
+    MAX_WORKERS = 1                 # 推测任务线程数
+    MAX_PENDING_JOBS = 4            # 同时存在的未认领任务上限
+    CONFIRMED_HIGH_WATER = 1        # 确认任务数达到该值时暂停推测任务
+    JOB_TTL_SECONDS = 300           # 未认领任务的存活时间（秒）
+    CLAIM_TIMEOUT_SECONDS = 30      # 认领时等待运行中任务的最长时间（秒）
+    SWEEP_INTERVAL_SECONDS = 10     # 过期任务清理间隔（秒）
+    UPLOAD_SUBFOLDER = 'speculative'  # 推测任务文件存放的上传子目录
+
+class ArchiveConfig:
+    """会话音频归档配置"""
+    
+    ENABLED = False                 # 是否归档会话音频（默认关闭）
+    ARCHIVE_DIR = 'archive'         # 归档目录
+    WRITE_QUEUE_MAX_CHUNKS = 256    # 写入队列最多缓存的音频块数，超出时丢弃而不阻塞识别
+    WRITE_BUFFER_BYTES = 256 * 1024  # PCM文件写缓冲大小
+    MAX_TOTAL_SIZE_MB = 1024        # 归档总大小上限（MB），超出时删除最旧的会话
+    MAX_AGE_DAYS = 7                # 归档保留天数
+
+class ResultStoreConfig:
+    """OCR结果存储与检索配置"""
+    
+    ENABLED = True                  # 是否保存处理结果
+    DB_PATH = 'results.db'          # SQLite数据库文件
+    WRITE_BATCH_SIZE = 50           # 每批最多写入的记录数
+    FLUSH_INTERVAL_SECONDS = 1.0    # 批量写入的最长等待时间（秒）
+    WRITE_QUEUE_MAX = 1000          # 待写入记录上限，超出时丢弃而不阻塞上传
+    DEFAULT_PAGE_SIZE = 20          # 检索默认每页条数
+    MAX_PAGE_SIZE = 100             # 检索每页条数上限
+
+class ImagePreprocessConfig:
+    """OCR前图像规范化配置（需要Pillow）"""
+    
+    ENABLED = True                  # 是否在OCR前规范化图像
+    CACHE_DIR = 'uploads/derived'   # 派生图像和缩略图缓存目录
+    TARGET_DPI = 200                # 目标分辨率（DPI）
+    PAGE_LONG_EDGE_INCHES = 11.69   # 图像无可信DPI时假定的页面长边（英寸，A4）
+    GRAYSCALE = True                # 转为灰度
+    JPEG_QUALITY = 85               # 重新编码的JPEG质量
+    THUMBNAIL_SIZE = 256            # 缩略图长边像素数
+    MAX_WORKERS = 2                 # 规范化线程数
+
+class AdaptivePresetConfig:
+    """流式识别预设的负载自适应配置"""
+    
+    ENABLED = True                  # 是否根据负载自动切换预设
+    SAMPLE_INTERVAL_SECONDS = 1.0   # 负载采样间隔（秒）
+    LAG_HIGH_SECONDS = 1.5          # 音频块处理延迟超过该值视为过载
+    LAG_LOW_SECONDS = 0.6           # 音频块处理延迟低于该值视为空闲
+    CPU_HIGH_PERCENT = 85           # CPU占用高水位
+    CPU_LOW_PERCENT = 60            # CPU占用低水位
+    HYSTERESIS_SAMPLES = 3          # 连续多少次采样越过水位才调整
+    MIN_DWELL_SECONDS = 10          # 两次调整之间的最短间隔（秒）
+    BOUNDARY_NOISE_MARGIN = 2.0     # 识别块能量不超过会话底噪的该倍数时视为语句边界
+    MAX_SWITCH_DEFER_BLOCKS = 10    # 等待语句边界超过该块数后，在下一个低于平均能量的块处强制切换
+
+class EmitConfig:
+    """识别结果发送配置"""
+    
+    COALESCE_WINDOW_MS = 100        # 合并窗口（毫秒），窗口内的多段结果合并为一条消息
+    MAX_MESSAGES_PER_SECOND = 5     # 每个客户端每秒最多发送的消息数
+    STATS_WINDOW_SECONDS = 10       # 每秒消息数的统计窗口（秒）
+
+class AudioHealthConfig:
+    """会话音频健康统计配置（报告间隔见AudioConfig.AUDIO_QUALITY_REPORT_INTERVAL）"""
+
+    CLIP_THRESHOLD = 0.99           # 幅度达到该值视为削波
+    DROPOUT_RMS = 1e-5              # RMS低于该值视为掉帧（数字静音）
+    MAX_CLIP_RATIO = 0.001          # 削波样本比例超过该值时告警
+    MAX_DC_OFFSET = 0.05            # 直流偏移超过该值时告警
+    MAX_DRIFT_PPM = 2000            # 采样率漂移超过该值（ppm）时告警
+    MAX_DROPOUT_RATIO = 0.05        # 掉帧块比例超过该值时告警
+    DROPOUT_MIN_CHUNKS = 20         # 收到至少该数量的块后才根据掉帧比例告警
+    SMOOTHING = 0.1                 # 滚动统计的指数平滑系数
+
 # 预设配置
 class PresetConfigs:
     """预设配置，用于不同的使用场景"""
@@ -96,7 +182,8 @@ class PresetConfigs:
         config = AudioConfig()
         config.CHUNK_DURATION_MS = 200  # 更短的块
         config.OVERLAP_DURATION_MS = 100  # 较少的重叠
-        config.ENCODER_CHUNK_LOOK_BACK = 4
+        config.CHUNK_SIZE_PARAMS = [0, 10, 4]  # 识别块长度不变（不增加调用次数），前瞻减少一帧
+        config.ENCODER_CHUNK_LOOK_BACK = 3
         config.DECODER_CHUNK_LOOK_BACK = 1
         config.MIN_ENERGY_THRESHOLD = 0.002  # 不太敏感的静音检测
         return config
@@ -105,6 +192,18 @@ class PresetConfigs:
     def get_balanced_config():
         """平衡配置（默认推荐）"""
         return AudioConfig()  # 使用默认值
+    
+    @staticmethod
+    def get_config(name):
+        """按名称获取预设配置: 'low_latency'、'balanced' 或 'high_accuracy'"""
+        presets = {
+            'low_latency': PresetConfigs.get_low_latency_config,
+            'balanced': PresetConfigs.get_balanced_config,
+            'high_accuracy': PresetConfigs.get_high_accuracy_config
+        }
+        if name not in presets:
+            raise ValueError(f"未知的预设: {name}")
+        return presets[name]()
 
 # 使用示例和说明
 """
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话音频健康统计
+每个音频块只做一次向量化统计（平方和、和、最小值、最大值，必要时统计削波样本），
+用指数平滑等方式更新会话的滚动统计，内存占用与会话时长无关：
+RMS、峰值、削波比例、直流偏移、底噪估计、掉帧（数字静音）和采样率漂移
+"""
+
+import time
+import numpy as np
+
+
+def _db(value):
+    """幅度转换为dBFS"""
+    return round(20 * float(np.log10(max(value, 1e-10))), 1)
+
+
+class AudioHealthMonitor:
+    """单个会话的滚动音频健康统计"""
+
+    def __init__(self, sample_rate=16000, clip_threshold=0.99, dropout_rms=1e-5,
+                 max_clip_ratio=0.001, max_dc_offset=0.05, min_rms=0.001,
+                 max_drift_ppm=2000, smoothing=0.1, noise_floor_rise=0.02,
+                 drift_min_seconds=5.0, dropout_min_chunks=20, max_dropout_ratio=0.05):
+        self._sample_rate = sample_rate
+        self._clip_threshold = clip_threshold
+        self._dropout_rms = dropout_rms
+        self._max_clip_ratio = max_clip_ratio
+        self._max_dc_offset = max_dc_offset
+        self._min_rms = min_rms
+        self._max_drift_ppm = max_drift_ppm
+        self._alpha = smoothing
+        self._noise_floor_rise = noise_floor_rise
+        self._drift_min_seconds = drift_min_seconds
+        self._dropout_min_chunks = dropout_min_chunks
+        self._max_dropout_ratio = max_dropout_ratio
+
+        self.chunks = 0
+        self.dropouts = 0
+        self._power = None  # 均方值（指数平滑）
+        self._dc_offset = 0.0
+        self._clip_ratio = 0.0
+        self._peak_hold = 0.0
+        self._noise_floor = None
+        self._first_arrival = None
+        self._last_arrival = None
+        self._samples_since_first = 0
+        self._drift_unknown = False
+        self._last_warnings = ()
+
+    def update(self, chunk, received_samples=None, now=None, track_drift=True):
+        """
+        统计一个float32音频块（归一化到[-1.0, 1.0]）
+        received_samples为音频源实际采集的样本数（缺省为块长度），用于估计采样率漂移；
+        track_drift为False表示采集样本数未知，此后不再估计采样率漂移
+        返回该块的(rms, peak)
+        """
+        n = chunk.size
+        if n == 0:
+            return 0.0, 0.0
+        now = time.time() if now is None else now
+        received_samples = n if received_samples is None else received_samples
+
+        # 单次统计：四个归约都作用在同一块已在缓存中的数据上
+        sum_squares = float(np.dot(chunk, chunk))
+        total = float(chunk.sum(dtype=np.float64))
+        peak = max(-float(chunk.min()), float(chunk.max()))
+        # 只有峰值达到阈值时才需要逐样本统计削波
+        clipped = int(np.count_nonzero(np.abs(chunk) >= self._clip_threshold)) if peak >= self._clip_threshold else 0
+
+        power = sum_squares / n
+        rms = power ** 0.5
+        alpha = self._alpha
+        self.chunks += 1
+
+        # 数字静音视为掉帧，只计数，不参与能量、直流、削波和底噪的滚动统计
+        if rms < self._dropout_rms:
+            self.dropouts += 1
+        else:
+            if self._power is None:
+                self._power = power
+                self._dc_offset = total / n
+                self._clip_ratio = clipped / n
+            else:
+                self._power += alpha * (power - self._power)
+                self._dc_offset += alpha * (total / n - self._dc_offset)
+                self._clip_ratio += alpha * (clipped / n - self._clip_ratio)
+            self._peak_hold = max(peak, self._peak_hold * (1 - alpha))
+
+            if self._noise_floor is None or rms < self._noise_floor:
+                self._noise_floor = rms
+            else:
+                # 最小值跟踪：底噪缓慢上升，遇到更安静的块立即下降
+                self._noise_floor *= 1 + self._noise_floor_rise
+
+        # 采样率漂移：第一块之后收到的样本数与两块到达时间间隔的比值
+        if not track_drift:
+            self._drift_unknown = True
+        if self._first_arrival is None:
+            self._first_arrival = now
+        else:
+            self._samples_since_first += received_samples
+        self._last_arrival = now
+
+        return rms, peak
+
+    def drift_ppm(self):
+        """估计的采样率漂移（ppm），数据不足时返回None"""
+        if self._first_arrival is None or self._drift_unknown:
+            return None
+        elapsed = self._last_arrival - self._first_arrival
+        if elapsed < self._drift_min_seconds:
+            return None
+        return round((self._samples_since_first / elapsed / self._sample_rate - 1) * 1e6)
+
+    def report(self):
+        """生成精简的音频质量报告"""
+        # 只收到数字静音时能量和底噪未知
+        rms = (self._power or 0.0) ** 0.5
+        noise_floor = self._noise_floor or 0.0
+        drift = self.drift_ppm()
+
+        warnings = []
+        if self._clip_ratio > self._max_clip_ratio:
+            warnings.append('clipping')
+        if abs(self._dc_offset) > self._max_dc_offset:
+            warnings.append('dc_offset')
+        if self._power is not None and rms < self._min_rms:
+            warnings.append('too_quiet')
+        # 块数太少时掉帧比例没有意义（麦克风启动时常有几块数字静音）
+        if self.chunks >= self._dropout_min_chunks and self.dropouts / self.chunks > self._max_dropout_ratio:
+            warnings.append('dropouts')
+        if drift is not None and abs(drift) > self._max_drift_ppm:
+            warnings.append('sample_rate_drift')
+
+        return {
+            'chunks': self.chunks,
+            'rms_db': _db(rms) if self._power is not None else None,
+            'peak': round(self._peak_hold, 4),
+            'clip_ratio': round(self._clip_ratio, 5),
+            'dc_offset': round(self._dc_offset, 5),
+            'noise_floor_db': _db(noise_floor) if noise_floor > 0 else None,
+            'snr_db': round(_db(rms) - _db(noise_floor), 1) if noise_floor > 0 else None,
+            'dropouts': self.dropouts,
+            'drift_ppm': drift,
+            'warnings': warnings
+        }
+
+    def report_due(self, interval):
+        """
+        是否应向客户端发送报告：每interval块发送一次，告警变化时立即发送
+        返回报告或None
+        """
+        report = self.report()
+        warnings = tuple(report['warnings'])
+        if self.chunks % interval == 0 or warnings != self._last_warnings:
+            self._last_warnings = warnings
+            return report
+        return None
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理后端基准测试
+使用同一段音频依次运行各推理后端，对比加载时间、实时率(RTF)、相对PyTorch的加速比，
+以及字错误率(CER)的变化
+
+用法:
+    python web/benchmark_backends.py --audio test.wav
+    python web/benchmark_backends.py --audio test.wav --reference "参考文本" --backends pytorch onnx_int8
+"""
+
+import time
+import wave
+import argparse
+import numpy as np
+
+from asr_backend import BACKENDS, load_model_settings, create_recognizer, recognize_chunk
+
+
+def load_wav(path):
+    """读取16kHz int16 WAV文件，返回float32音频（多声道只取第一声道）"""
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError("只支持16位PCM WAV文件")
+        sample_rate = f.getframerate()
+        channels = f.getnchannels()
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+
+    if sample_rate != 16000:
+        raise ValueError(f"采样率必须为16000Hz，实际为{sample_rate}Hz")
+    if channels > 1:
+        data = data[::channels]
+    return data.astype(np.float32) / 32768.0
+
+
+def transcribe(recognizer, audio, settings):
+    """与Web服务相同的流式方式逐块识别整段音频"""
+    chunk_samples = settings['chunk_size'][1] * 960
+    cache = {}
+    texts = []
+    total_chunks = max(1, int(np.ceil(len(audio) / chunk_samples)))
+
+    for i in range(total_chunks):
+        speech_chunk = audio[i * chunk_samples:(i + 1) * chunk_samples]
+        res = recognize_chunk(recognizer, speech_chunk, cache, i == total_chunks - 1, settings)
+        if res and len(res) > 0:
+            texts.append(res[0].get('text', ''))
+
+    return ''.join(texts)
+
+
+def character_error_rate(hypothesis, reference):
+    """计算字错误率（忽略空白字符）"""
+    hyp = ''.join(hypothesis.split())
+    ref = ''.join(reference.split())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    # 编辑距离（逐行滚动数组）
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='语音识别推理后端基准测试')
+    parser.add_argument('--audio', required=True, help='测试音频（16kHz 16位 WAV）')
+    parser.add_argument('--reference', default=None, help='参考文本；未提供时以PyTorch后端的结果作为参考')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS), help='要测试的后端')
+    parser.add_argument('--runs', type=int, default=3, help='每个后端的重复次数，取最快一次 (默认: 3)')
+    args = parser.parse_args()
+
+    settings = load_model_settings()
+    audio = load_wav(args.audio)
+    audio_seconds = len(audio) / 16000
+    print(f"测试音频: {args.audio}, 时长={audio_seconds:.2f}秒")
+
+    # PyTorch作为基线，始终最先运行
+    backends = sorted(set(args.backends) | {'pytorch'}, key=BACKENDS.index)
+    results = {}
+    for backend in backends:
+        backend_settings = dict(settings, backend=backend)
+        try:
+            start = time.perf_counter()
+            recognizer = create_recognizer(backend_settings)
+            load_time = time.perf_counter() - start
+
+            # 预热一次，避免首次推理的初始化开销影响计时
+            transcribe(recognizer, audio[:backend_settings['chunk_size'][1] * 960], backend_settings)
+
+            best = None
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                text = transcribe(recognizer, audio, backend_settings)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[backend] = {'load_time': load_time, 'elapsed': best, 'text': text}
+        except Exception as e:
+            print(f"✗ 后端 {backend} 运行失败: {e}")
+
+    if 'pytorch' not in results:
+        print("PyTorch基线运行失败，无法对比")
+        return
+
+    reference = args.reference if args.reference is not None else results['pytorch']['text']
+    baseline = results['pytorch']
+    baseline_cer = character_error_rate(baseline['text'], reference)
+
+    print("=" * 72)
+    print(f"{'后端':<12}{'加载(秒)':>10}{'推理(秒)':>10}{'RTF':>8}{'加速比':>8}{'CER':>9}{'ΔCER':>9}")
+    print("-" * 72)
+    for backend, r in results.items():
+        cer = character_error_rate(r['text'], reference)
+        print(f"{backend:<12}{r['load_time']:>10.2f}{r['elapsed']:>10.3f}"
+              f"{r['elapsed'] / audio_seconds:>8.3f}{baseline['elapsed'] / r['elapsed']:>7.2f}x"
+              f"{cer:>9.2%}{cer - baseline_cer:>+9.2%}")
+    print("=" * 72)
+    for backend, r in results.items():
+        print(f"[{backend}] {r['text']}")
+
+
+if __name__ == '__main__':
+    main()
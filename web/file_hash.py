@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件内容哈希
+图像规范化缓存和OCR结果存储都按文件内容哈希识别同一文件
+"""
+
+import hashlib
+
+
+def file_sha256(file_path):
+    """计算文件的SHA-256哈希"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
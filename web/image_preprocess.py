@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR前的图像规范化
+上传的图片在送入OCR之前：按需降采样解码、按EXIF方向旋转、缩放到目标DPI、
+转为灰度并重新压缩编码，同时生成界面使用的缩略图。
+派生图像按文件内容哈希缓存，同一文件再次上传时直接复用
+
+依赖Pillow；未安装时该阶段直接使用原始文件
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from file_hash import file_sha256
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# 可以解码处理的图像格式（PDF等其他格式直接送入OCR）
+RASTER_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tiff'}
+
+
+class ImagePreprocessor:
+    """图像规范化阶段，在线程池中执行，派生图像按内容哈希缓存"""
+
+    def __init__(self, cache_dir, target_dpi=200, page_long_edge_inches=11.69,
+                 grayscale=True, jpeg_quality=85, thumbnail_size=256, max_workers=2):
+        self.cache_dir = cache_dir
+        self._target_dpi = target_dpi
+        self._page_long_edge_inches = page_long_edge_inches
+        self._grayscale = grayscale
+        self._jpeg_quality = jpeg_quality
+        self._thumbnail_size = thumbnail_size
+        # 处理参数变化时派生图像需要重新生成，因此参数也作为缓存键的一部分
+        self._signature = f"d{target_dpi}{'g' if grayscale else 'c'}q{jpeg_quality}t{thumbnail_size}"
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-preprocess')
+        self._lock = threading.Lock()
+        self._stats = {
+            'images': 0,
+            'cache_hits': 0,
+            'passthrough': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'bytes_saved': 0,
+            'processing_seconds': 0.0,
+            'time_saved_seconds': 0.0,
+        }
+
+        os.makedirs(cache_dir, exist_ok=True)
+        if Image is None:
+            print("警告: 未安装Pillow，跳过OCR前的图像规范化")
+
+    def process(self, file_path):
+        """在线程池中规范化图像并等待结果"""
+        return self._executor.submit(self._process, file_path).result()
+
+    def thumbnail_path(self, cache_key):
+        """缩略图文件路径"""
+        return os.path.join(self.cache_dir, f"{cache_key}_thumb.jpg")
+
+    def stats(self):
+        """返回统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['processing_seconds'] = round(stats['processing_seconds'], 3)
+        stats['time_saved_seconds'] = round(stats['time_saved_seconds'], 3)
+        return stats
+
+    def _process(self, file_path):
+        """
+        返回规范化结果:
+            content_hash  原始文件SHA-256
+            cache_key     派生图像缓存键（未生成派生图像时为None）
+            ocr_path      送入OCR的文件路径
+            thumbnail_path 缩略图路径（没有时为None）
+        """
+        start = time.perf_counter()
+        content_hash = file_sha256(file_path)
+        original_bytes = os.path.getsize(file_path)
+        result = {
+            'content_hash': content_hash,
+            'cache_key': None,
+            'ocr_path': file_path,
+            'thumbnail_path': None,
+            'cached': False
+        }
+
+        extension = file_path.rsplit('.', 1)[-1].lower()
+        if Image is None or extension not in RASTER_EXTENSIONS:
+            self._record_passthrough(original_bytes)
+            return result
+
+        cache_key = f"{content_hash}_{self._signature}"
+        derived_path = os.path.join(self.cache_dir, f"{cache_key}.jpg")
+        meta_path = os.path.join(self.cache_dir, f"{cache_key}.json")
+
+        # 命中缓存：节省的时间即首次处理时记录的耗时
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                result.update(cache_key=cache_key, cached=True,
+                              ocr_path=derived_path if meta['use_derived'] else file_path,
+                              thumbnail_path=self.thumbnail_path(cache_key))
+                with self._lock:
+                    self._stats['images'] += 1
+                    self._stats['cache_hits'] += 1
+                    self._stats['bytes_in'] += original_bytes
+                    self._stats['bytes_out'] += meta['output_bytes']
+                    self._stats['bytes_saved'] += original_bytes - meta['output_bytes']
+                    self._stats['time_saved_seconds'] += meta['processing_seconds']
+                return result
+            except (OSError, ValueError, KeyError):
+                pass
+
+        try:
+            use_derived = self._normalize(file_path, derived_path, self.thumbnail_path(cache_key), original_bytes)
+        except Exception as e:
+            print(f"图像规范化失败，使用原始文件: {e}")
+            self._record_passthrough(original_bytes)
+            return result
+
+        output_bytes = os.path.getsize(derived_path) if use_derived else original_bytes
+        elapsed = time.perf_counter() - start
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'use_derived': use_derived, 'output_bytes': output_bytes,
+                       'processing_seconds': elapsed}, f)
+
+        result.update(cache_key=cache_key,
+                      ocr_path=derived_path if use_derived else file_path,
+                      thumbnail_path=self.thumbnail_path(cache_key))
+        with self._lock:
+            self._stats['images'] += 1
+            self._stats['bytes_in'] += original_bytes
+            self._stats['bytes_out'] += output_bytes
+            self._stats['bytes_saved'] += original_bytes - output_bytes
+            self._stats['processing_seconds'] += elapsed
+        print(f"图像规范化完成: {original_bytes}字节 -> {output_bytes}字节, 耗时{elapsed:.3f}秒")
+        return result
+
+    def _normalize(self, file_path, derived_path, thumbnail_path, original_bytes):
+        """生成派生图像和缩略图，返回OCR是否应使用派生图像"""
+        with Image.open(file_path) as img:
+            # 多页图像（如多页TIFF）保持原样
+            if getattr(img, 'n_frames', 1) > 1:
+                raise ValueError("多页图像不做规范化")
+
+            orientation = img.getexif().get(0x0112, 1)
+            target_long_edge = self._target_long_edge(img)
+            mode = 'L' if self._grayscale else 'RGB'
+
+            # Image.open只读取文件头；JPEG可在解码时直接按DCT缩放，避免解码全分辨率
+            long_edge = max(img.size)
+            if long_edge > target_long_edge:
+                scale = target_long_edge / long_edge
+                img.draft(mode, (int(img.size[0] * scale), int(img.size[1] * scale)))
+
+            image = ImageOps.exif_transpose(img)
+            image = image.convert(mode)
+            image.thumbnail((target_long_edge, target_long_edge), Image.LANCZOS)
+            image.save(derived_path, 'JPEG', quality=self._jpeg_quality, optimize=True,
+                       dpi=(self._target_dpi, self._target_dpi))
+
+            thumbnail = image.copy()
+            thumbnail.thumbnail((self._thumbnail_size, self._thumbnail_size), Image.LANCZOS)
+            thumbnail.save(thumbnail_path, 'JPEG', quality=75, optimize=True)
+
+        # 派生图像比原图更大且无需旋转时，OCR直接使用原图
+        if os.path.getsize(derived_path) >= original_bytes and orientation == 1:
+            os.remove(derived_path)
+            return False
+        return True
+
+    def _target_long_edge(self, img):
+        """
+        计算目标DPI下的长边像素数
+        扫描件自带的DPI可信时按实际尺寸计算；手机照片通常只写入72DPI等无意义的值，按A4长边计算
+        """
+        dpi = img.info.get('dpi')
+        if dpi and dpi[0] and dpi[0] >= 100:
+            long_edge_inches = max(img.size) / float(dpi[0])
+        else:
+            long_edge_inches = self._page_long_edge_inches
+        return max(self._thumbnail_size, int(long_edge_inches * self._target_dpi))
+
+    def _record_passthrough(self, original_bytes):
+        with self._lock:
+            self._stats['images'] += 1
+            self._stats['passthrough'] += 1
+            self._stats['bytes_in'] += original_bytes
+            self._stats['bytes_out'] += original_bytes
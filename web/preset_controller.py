@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式识别预设的负载自适应控制
+客户端在start_recording时可以指定预设（low_latency / balanced / high_accuracy），
+未指定时使用config.json中的model_config参数（default）。
+控制器周期性采样队列延迟和CPU占用，负载升高时整体降档、负载恢复后升档（带滞回），
+各会话在语句边界处切换到降档后的预设。
+降档阶梯按各预设实际参数估计的识别开销排列，每降一档都减少计算量
+"""
+
+import os
+import time
+import threading
+from collections import defaultdict
+
+from audio_config import PresetConfigs
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_PRESET = 'default'
+
+# 客户端可以指定的预设
+PRESETS = ('low_latency', 'balanced', 'high_accuracy')
+
+
+def preset_settings(name, base_settings):
+    """返回预设对应的流式识别参数（在base_settings基础上覆盖）"""
+    if name == DEFAULT_PRESET:
+        return dict(base_settings, silence_threshold=PresetConfigs.get_config('balanced').MIN_ENERGY_THRESHOLD)
+
+    config = PresetConfigs.get_config(name)
+    return dict(
+        base_settings,
+        chunk_size=list(config.CHUNK_SIZE_PARAMS),
+        encoder_chunk_look_back=config.ENCODER_CHUNK_LOOK_BACK,
+        decoder_chunk_look_back=config.DECODER_CHUNK_LOOK_BACK,
+        silence_threshold=config.MIN_ENERGY_THRESHOLD
+    )
+
+
+def preset_cost(settings):
+    """
+    估计每秒音频的相对识别开销
+    每次generate处理当前块、前瞻帧和回望的上下文：块越短调用越频繁，回望越多单次开销越大
+    """
+    _, chunk, lookahead = settings['chunk_size']
+    return 1 + lookahead / chunk + settings['encoder_chunk_look_back'] + settings['decoder_chunk_look_back']
+
+
+def preset_ladder(base_settings):
+    """按识别开销从低到高排列全部预设（包括default），开销相同的预设只保留一个档位"""
+    ladder, costs = [], set()
+    for name in sorted((DEFAULT_PRESET,) + PRESETS, key=lambda n: preset_cost(preset_settings(n, base_settings))):
+        cost = preset_cost(preset_settings(name, base_settings))
+        if cost not in costs:
+            ladder.append(name)
+            costs.add(cost)
+    return tuple(ladder)
+
+
+def _cpu_percent():
+    """当前CPU占用（百分比）；没有psutil时用1分钟负载估算，都不可用时返回None"""
+    if psutil is not None:
+        return psutil.cpu_percent(interval=None)
+    if hasattr(os, 'getloadavg'):
+        return os.getloadavg()[0] / (os.cpu_count() or 1) * 100
+    return None
+
+
+class PresetController:
+    """
+    预设控制器
+
+    degrade_level表示在会话请求的预设基础上向开销更低的方向降几档。
+    连续hysteresis_samples次采样超过高水位才降档、低于低水位才升档，
+    且两次调整之间至少间隔min_dwell_seconds，避免在阈值附近来回切换
+    """
+
+    def __init__(self, base_settings, enabled=True, sample_interval=1.0,
+                 lag_high=1.5, lag_low=0.6, cpu_high=85, cpu_low=60,
+                 hysteresis_samples=3, min_dwell_seconds=10):
+        self._enabled = enabled
+        self._costs = {name: preset_cost(preset_settings(name, base_settings))
+                       for name in (DEFAULT_PRESET,) + PRESETS}
+        self._ladder = preset_ladder(base_settings)
+        self._sample_interval = sample_interval
+        self._lag_high = lag_high
+        self._lag_low = lag_low
+        self._cpu_high = cpu_high
+        self._cpu_low = cpu_low
+        self._hysteresis_samples = hysteresis_samples
+        self._min_dwell_seconds = min_dwell_seconds
+
+        self._lock = threading.Lock()
+        self._requested = {}  # sid -> 客户端请求的预设
+        self._active = {}  # sid -> 当前生效的预设
+        self._lag = {}  # sid -> 最近的处理延迟（秒，指数平滑）
+        self._degrade_level = 0
+        self._last_change = 0.0
+        self._over_count = 0
+        self._under_count = 0
+        self._last_cpu = None
+        self._switches = defaultdict(int)  # 'from->to' -> 次数
+        self._level_changes = 0
+
+        if enabled:
+            if psutil is not None:
+                psutil.cpu_percent(interval=None)  # 第一次调用只用于建立基准
+            sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            sampler.start()
+
+    def register(self, sid, requested=None):
+        """登记会话请求的预设，返回初始生效的预设名称"""
+        if requested not in PRESETS:
+            requested = DEFAULT_PRESET
+        with self._lock:
+            self._requested[sid] = requested
+            self._lag.pop(sid, None)
+            active = self._target_locked(sid)
+            self._active[sid] = active
+        return active
+
+    def unregister(self, sid):
+        with self._lock:
+            self._requested.pop(sid, None)
+            self._active.pop(sid, None)
+            self._lag.pop(sid, None)
+
+    def active_preset(self, sid):
+        with self._lock:
+            return self._active.get(sid, DEFAULT_PRESET)
+
+    def report_lag(self, sid, lag_seconds):
+        """记录会话音频块从入队到处理完成的延迟"""
+        with self._lock:
+            if sid not in self._requested:
+                return
+            previous = self._lag.get(sid)
+            self._lag[sid] = lag_seconds if previous is None else 0.7 * previous + 0.3 * lag_seconds
+
+    def pending_switch(self, sid):
+        """会话在语句边界处应切换到的预设；无需切换时返回None"""
+        with self._lock:
+            if sid not in self._requested:
+                return None
+            target = self._target_locked(sid)
+            return target if target != self._active.get(sid) else None
+
+    def apply_switch(self, sid, preset, reason='load'):
+        """会话已在语句边界完成切换，记录指标"""
+        with self._lock:
+            previous = self._active.get(sid, DEFAULT_PRESET)
+            self._active[sid] = preset
+            self._switches[f"{previous}->{preset}"] += 1
+        print(f"会话 {sid} 预设切换: {previous} -> {preset} ({reason})")
+        return previous
+
+    def stats(self):
+        """返回统计信息"""
+        with self._lock:
+            return {
+                'enabled': self._enabled,
+                'degrade_level': self._degrade_level,
+                'level_changes': self._level_changes,
+                'cpu_percent': self._last_cpu,
+                'ladder': list(self._ladder),
+                'max_lag_seconds': round(max(self._lag.values()), 3) if self._lag else 0.0,
+                'switches': dict(self._switches),
+                'sessions': dict(self._active)
+            }
+
+    def _target_locked(self, sid):
+        """会话在当前降档等级下的目标预设（需持有锁）"""
+        requested = self._requested[sid]
+        if self._degrade_level == 0:
+            return requested
+        # 只在开销低于请求预设的档位中降档
+        cheaper = [name for name in self._ladder if self._costs[name] < self._costs[requested]]
+        if not cheaper:
+            return requested
+        return cheaper[max(0, len(cheaper) - self._degrade_level)]
+
+    def _sample_loop(self):
+        """周期性采样负载并调整降档等级"""
+        while True:
+            time.sleep(self._sample_interval)
+            cpu = _cpu_percent()
+            with self._lock:
+                self._last_cpu = round(cpu, 1) if cpu is not None else None
+                lag = max(self._lag.values()) if self._lag else 0.0
+                overloaded = lag > self._lag_high or (cpu is not None and cpu > self._cpu_high)
+                relaxed = lag < self._lag_low and (cpu is None or cpu < self._cpu_low)
+
+                self._over_count = self._over_count + 1 if overloaded else 0
+                self._under_count = self._under_count + 1 if relaxed else 0
+                if time.time() - self._last_change < self._min_dwell_seconds:
+                    continue
+
+                max_level = len(self._ladder) - 1
+                if self._over_count >= self._hysteresis_samples and self._degrade_level < max_level:
+                    self._set_level_locked(self._degrade_level + 1, lag, cpu)
+                elif self._under_count >= self._hysteresis_samples and self._degrade_level > 0:
+                    self._set_level_locked(self._degrade_level - 1, lag, cpu)
+
+    def _set_level_locked(self, level, lag, cpu):
+        print(f"负载自适应: 降档等级 {self._degrade_level} -> {level} (延迟={lag:.2f}秒, CPU={cpu})")
+        self._degrade_level = level
+        self._level_changes += 1
+        self._last_change = time.time()
+        self._over_count = 0
+        self._under_count = 0
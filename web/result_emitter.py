@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+识别结果的合并与限速发送
+每个会话的识别结果先进入输出缓冲区，合并窗口内产生的结果合并为一条消息，
+每个客户端每秒最多发送限定数量的消息；语句结束时立即发送。
+所有会话的消息由同一个发送线程发出
+"""
+
+import time
+import threading
+from collections import deque
+
+
+class _SessionBuffer:
+    """单个会话的输出缓冲区"""
+
+    def __init__(self):
+        self.segments = []
+        self.produced_at = []  # 每段结果对应音频的入队时间（time.time）
+        self.first_buffered = None  # 第一段进入缓冲区的时间（time.monotonic）
+        self.last_sent = float('-inf')
+        self.urgent = False
+
+    def due_at(self, window, min_interval):
+        if self.urgent:
+            return 0.0
+        return max(self.first_buffered + window, self.last_sent + min_interval)
+
+
+class ResultEmitter:
+    """识别结果发送器"""
+
+    def __init__(self, emit, window_seconds=0.1, max_messages_per_second=5, stats_window_seconds=10):
+        self._emit = emit  # emit(event, data, room)
+        self._window = window_seconds
+        self._min_interval = 1.0 / max_messages_per_second if max_messages_per_second > 0 else 0.0
+        self._stats_window = stats_window_seconds
+
+        self._buffers = {}  # sid -> _SessionBuffer
+        self._cond = threading.Condition()
+        self._messages = 0
+        self._segments = 0
+        self._sent_times = deque()  # 最近发送时间，用于计算每秒消息数
+        self._delays = deque(maxlen=1000)  # 最近的端到端延迟（秒）
+
+        sender = threading.Thread(target=self._sender_loop, daemon=True)
+        sender.start()
+
+    def submit(self, sid, text, produced_at=None):
+        """
+        提交一段识别结果
+        produced_at为该结果对应音频的入队时间，用于统计端到端延迟
+        """
+        with self._cond:
+            buffer = self._buffers.setdefault(sid, _SessionBuffer())
+            if not buffer.segments:
+                buffer.first_buffered = time.monotonic()
+            buffer.segments.append(text)
+            buffer.produced_at.append(produced_at if produced_at is not None else time.time())
+            self._cond.notify()
+
+    def flush(self, sid):
+        """语句结束时立即发送缓冲区中的结果（不受合并窗口和限速约束）"""
+        with self._cond:
+            buffer = self._buffers.get(sid)
+            if buffer is not None and buffer.segments:
+                buffer.urgent = True
+                self._cond.notify()
+
+    def discard(self, sid):
+        """会话断开时丢弃缓冲区"""
+        with self._cond:
+            self._buffers.pop(sid, None)
+
+    def stats(self):
+        """返回统计信息"""
+        with self._cond:
+            self._trim_sent_times(time.monotonic())
+            delays = sorted(self._delays)
+            return {
+                'messages': self._messages,
+                'segments': self._segments,
+                'messages_per_second': round(len(self._sent_times) / self._stats_window, 2),
+                'avg_delay_ms': round(sum(delays) / len(delays) * 1000, 1) if delays else 0.0,
+                'p95_delay_ms': round(delays[min(len(delays) - 1, int(len(delays) * 0.95))] * 1000, 1) if delays else 0.0,
+                'buffered_sessions': sum(1 for b in self._buffers.values() if b.segments)
+            }
+
+    def _sender_loop(self):
+        """发送线程：等待最早到期的缓冲区，发出所有到期的合并消息"""
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                pending = [(sid, b) for sid, b in self._buffers.items() if b.segments]
+                due = [(sid, b) for sid, b in pending if b.due_at(self._window, self._min_interval) <= now]
+                if not due:
+                    next_due = min((b.due_at(self._window, self._min_interval) for _, b in pending), default=None)
+                    self._cond.wait(timeout=None if next_due is None else next_due - now)
+                    continue
+
+                messages = []
+                for sid, buffer in due:
+                    messages.append((sid, buffer.segments, buffer.produced_at))
+                    buffer.segments, buffer.produced_at = [], []
+                    buffer.last_sent = now
+                    buffer.urgent = False
+
+            for sid, segments, produced_at in messages:
+                try:
+                    self._emit('recognition_result', {'text': ' '.join(segments), 'segments': segments}, sid)
+                except Exception as e:
+                    print(f"发送识别结果失败: {e}")
+                    continue
+
+                sent_wall = time.time()
+                with self._cond:
+                    self._messages += 1
+                    self._segments += len(segments)
+                    self._sent_times.append(time.monotonic())
+                    self._trim_sent_times(self._sent_times[-1])
+                    self._delays.extend(sent_wall - t for t in produced_at)
+
+    def _trim_sent_times(self, now):
+        while self._sent_times and now - self._sent_times[0] > self._stats_window:
+            self._sent_times.popleft()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR结果存储
+使用SQLite保存每个处理过的文档（OCR文本、音频转写、分类、文件哈希、耗时），
+并通过FTS5全文索引提供检索。中日韩文字在入库和查询时按单字切分，
+查询中的连续汉字作为短语匹配，使"苍溪县"这类词无需分词词典也能检索
+
+写入由后台线程批量提交，上传请求只需把记录放入队列
+"""
+
+import re
+import json
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import closing
+
+from file_hash import file_sha256
+
+# 中日韩统一表意文字、扩展A、兼容表意文字、假名、韩文音节
+_CJK_CHAR = '㐀-䶿一-鿿豈-﫿぀-ヿ가-힯'
+_CJK_RE = re.compile(f'([{_CJK_CHAR}])')
+_TOKEN_RE = re.compile(r'\w+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_hash TEXT NOT NULL,
+    filename TEXT,
+    file_path TEXT,
+    category TEXT,
+    audio_text TEXT,
+    ocr_text TEXT,
+    timings TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(file_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_created ON documents(created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    filename, category, audio_text, ocr_text, tokenize='unicode61'
+);
+"""
+
+_COLUMNS = ('id', 'file_hash', 'filename', 'file_path', 'category',
+            'audio_text', 'ocr_text', 'timings', 'created_at')
+
+
+def tokenize_cjk(text):
+    """在每个中日韩字符两侧插入空格，使FTS5按单字建立索引"""
+    return _CJK_RE.sub(r' \1 ', text or '')
+
+
+def build_match_query(query):
+    """
+    把用户输入转换为FTS5 MATCH表达式
+    连续的汉字组成短语（要求相邻），其余词单独匹配，所有部分之间为AND关系
+    """
+    parts = []
+    for term in query.split():
+        phrase = []
+        for token in _TOKEN_RE.findall(tokenize_cjk(term)):
+            if _CJK_RE.fullmatch(token):
+                phrase.append(token)
+                continue
+            if phrase:
+                parts.append('"' + ' '.join(phrase) + '"')
+                phrase = []
+            parts.append(f'"{token}"')
+        if phrase:
+            parts.append('"' + ' '.join(phrase) + '"')
+    return ' AND '.join(parts) if parts else None
+
+
+def _make_snippet(record, query, width=40):
+    """从原始文本中截取包含查询词的片段"""
+    text = record.get('ocr_text') or record.get('audio_text') or ''
+    positions = [text.find(term) for term in query.split() if term and text.find(term) >= 0]
+    if not positions:
+        return text[:width * 2]
+    start = max(0, min(positions) - width)
+    return ('...' if start > 0 else '') + text[start:start + width * 2] + ('...' if start + width * 2 < len(text) else '')
+
+
+class ResultStore:
+    """OCR结果存储，写入批量异步进行，读取使用独立连接"""
+
+    def __init__(self, db_path, batch_size=50, flush_interval=1.0, max_queued=1000):
+        self.db_path = db_path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._stats = {'queued': 0, 'written': 0, 'dropped': 0, 'batches': 0}
+        self._lock = threading.Lock()
+
+        # SQLite未编译FTS5时建表会抛出sqlite3.OperationalError，由调用方决定是否禁用存储
+        with closing(sqlite3.connect(db_path)) as conn:
+            # WAL模式下读取不会被后台写入阻塞
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+        writer = threading.Thread(target=self._writer_loop, daemon=True)
+        writer.start()
+
+    def add(self, record):
+        """
+        提交一条文档记录（不阻塞）
+        record包含filename、file_path、category、audio_text、ocr_text、timings，
+        可选file_hash（缺省时由后台线程根据file_path计算）
+        """
+        record = dict(record, created_at=record.get('created_at', time.time()))
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            print("结果存储队列已满，丢弃记录")
+            return False
+        with self._lock:
+            self._stats['queued'] += 1
+        return True
+
+    def search(self, query='', category=None, page=1, page_size=20):
+        """全文检索，返回(总数, 当前页记录)"""
+        match = build_match_query(query) if query else None
+        conditions, params = [], []
+        if match:
+            conditions.append('documents_fts MATCH ?')
+            params.append(match)
+        if category:
+            conditions.append('d.category = ?')
+            params.append(category)
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        order = 'ORDER BY bm25(documents_fts), d.created_at DESC' if match else 'ORDER BY d.created_at DESC'
+        columns = ', '.join(f'd.{c}' for c in _COLUMNS)
+        base = f'FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid {where}'
+
+        with self._connect() as conn:
+            total = conn.execute(f'SELECT count(*) {base}', params).fetchone()[0]
+            rows = conn.execute(f'SELECT {columns} {base} {order} LIMIT ? OFFSET ?',
+                                params + [page_size, (page - 1) * page_size]).fetchall()
+
+        items = []
+        for row in rows:
+            record = self._to_record(row)
+            items.append({
+                'id': record['id'],
+                'filename': record['filename'],
+                'category': record['category'],
+                'file_hash': record['file_hash'],
+                'created_at': record['created_at'],
+                'snippet': _make_snippet(record, query)
+            })
+        return total, items
+
+    def get(self, doc_id):
+        """按ID查询完整记录"""
+        with self._connect() as conn:
+            row = conn.execute(f'SELECT {", ".join(_COLUMNS)} FROM documents WHERE id = ?', (doc_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def find_by_hash(self, file_hash):
+        """按文件哈希查询全部记录（新记录在前）"""
+        with self._connect() as conn:
+            rows = conn.execute(f'SELECT {", ".join(_COLUMNS)} FROM documents WHERE file_hash = ? '
+                                'ORDER BY created_at DESC', (file_hash,)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def stats(self):
+        """返回统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.db_path, timeout=5))
+
+    @staticmethod
+    def _to_record(row):
+        record = dict(zip(_COLUMNS, row))
+        record['timings'] = json.loads(record['timings']) if record['timings'] else {}
+        return record
+
+    def _writer_loop(self):
+        """后台写入线程：攒够一批或达到刷新间隔后在一个事务中提交"""
+        conn = sqlite3.connect(self.db_path)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self._flush_interval
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(conn, batch)
+                with self._lock:
+                    self._stats['written'] += len(batch)
+                    self._stats['batches'] += 1
+            except Exception as e:
+                print(f"结果存储写入失败: {e}")
+
+    @staticmethod
+    def _write_batch(conn, batch):
+        for record in batch:
+            if not record.get('file_hash'):
+                try:
+                    record['file_hash'] = file_sha256(record['file_path'])
+                except OSError:
+                    record['file_hash'] = ''
+
+        with conn:
+            for record in batch:
+                cursor = conn.execute(
+                    'INSERT INTO documents (file_hash, filename, file_path, category, audio_text, '
+                    'ocr_text, timings, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (record['file_hash'], record.get('filename'), record.get('file_path'),
+                     record.get('category'), record.get('audio_text'), record.get('ocr_text'),
+                     json.dumps(record.get('timings', {}), ensure_ascii=False), record['created_at'])
+                )
+                conn.execute(
+                    'INSERT INTO documents_fts (rowid, filename, category, audio_text, ocr_text) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (cursor.lastrowid, tokenize_cjk(record.get('filename')), tokenize_cjk(record.get('category')),
+                     tokenize_cjk(record.get('audio_text')), tokenize_cjk(record.get('ocr_text')))
+                )
+
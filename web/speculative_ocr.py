@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推测式OCR预处理
+在用户选择文件时即上传并在后台启动OCR，录音结束提交/upload时直接认领结果，
+使OCR耗时与口述录音耗时重叠，而不是相加
+"""
+
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+
+class SpeculativeJob:
+    """单个推测式OCR任务"""
+
+    def __init__(self, token, client_id, filename, file_path, category):
+        self.token = token
+        self.client_id = client_id
+        self.filename = filename
+        self.file_path = file_path
+        self.category = category
+        self.created_at = time.time()
+        self.cancel_event = threading.Event()
+        self.future = None
+
+
+class SpeculativeOCRManager:
+    """
+    推测式OCR任务管理器
+
+    - 每个客户端同时只保留一个未认领任务，重新选择文件会取消旧任务
+    - 未认领任务超过TTL后自动取消并删除上传的文件
+    - 后台线程池大小、排队任务数受预算限制；确认任务（/upload）进行中时
+      推测任务暂缓执行，避免挤占确认任务的资源
+    """
+
+    def __init__(self, run_job, max_workers=1, max_pending=4,
+                 ttl_seconds=300, confirmed_high_water=1,
+                 claim_timeout=30, sweep_interval=10):
+        self._run_job = run_job
+        self._max_pending = max_pending
+        self._ttl_seconds = ttl_seconds
+        self._confirmed_high_water = confirmed_high_water
+        self._claim_timeout = claim_timeout
+        self._sweep_interval = sweep_interval
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='speculative-ocr')
+        self._jobs = {}  # token -> SpeculativeJob
+        self._lock = threading.Lock()
+        self._load_changed = threading.Condition(self._lock)
+        self._confirmed_active = 0
+
+        self._stats = {
+            'submitted': 0,
+            'rejected_budget': 0,
+            'completed': 0,
+            'failed': 0,
+            'claimed_done': 0,
+            'claimed_inflight': 0,
+            'claim_misses': 0,
+            'cancelled': 0,
+            'expired': 0,
+        }
+
+        sweeper = threading.Thread(target=self._sweep_loop, daemon=True)
+        sweeper.start()
+
+    def submit(self, client_id, filename, file_path, category):
+        """
+        提交推测任务
+        返回任务token；超出预算时返回None，调用方应删除已保存的文件
+        """
+        with self._lock:
+            # 同一客户端重新选择文件，取消之前未认领的任务
+            for job in [j for j in self._jobs.values() if j.client_id == client_id]:
+                self._cancel_locked(job, 'cancelled')
+
+            # 确认任务进行中时不拒绝，任务在_execute中等待确认任务结束后再执行
+            if len(self._jobs) >= self._max_pending:
+                self._stats['rejected_budget'] += 1
+                return None
+
+            token = uuid.uuid4().hex
+            job = SpeculativeJob(token, client_id, filename, file_path, category)
+            self._jobs[token] = job
+            self._stats['submitted'] += 1
+            job.future = self._executor.submit(self._execute, job)
+
+        print(f"推测式OCR任务已提交: {token} ({filename})")
+        return token
+
+    def claim(self, token, filename):
+        """
+        认领推测任务结果
+        任务已完成时直接返回结果，仍在运行时等待其完成；
+        任务不存在、已取消、文件名不符或执行失败时返回None，调用方应回退到同步OCR
+        """
+        with self._lock:
+            job = self._jobs.get(token)
+            if job is None or job.filename != filename:
+                self._stats['claim_misses'] += 1
+                return None
+            del self._jobs[token]
+            if job.future.done():
+                self._stats['claimed_done'] += 1
+            else:
+                self._stats['claimed_inflight'] += 1
+
+        try:
+            result = job.future.result(timeout=self._claim_timeout)
+        except FutureTimeoutError:
+            print(f"推测式OCR任务等待超时: {token}")
+            job.cancel_event.set()
+            result = None
+        except Exception as e:
+            print(f"推测式OCR任务执行失败: {e}")
+            result = None
+
+        if result is None:
+            with self._lock:
+                self._stats['claim_misses'] += 1
+        return result
+
+    def cancel(self, token):
+        """取消指定的推测任务"""
+        with self._lock:
+            job = self._jobs.get(token)
+            if job is None:
+                return False
+            self._cancel_locked(job, 'cancelled')
+            return True
+
+    def cancel_client(self, client_id):
+        """取消某个客户端的全部未认领任务（如连接断开时）"""
+        with self._lock:
+            for job in [j for j in self._jobs.values() if j.client_id == client_id]:
+                self._cancel_locked(job, 'cancelled')
+
+    @contextmanager
+    def confirmed_job(self):
+        """标记一个确认任务正在执行，期间推测任务让出资源"""
+        with self._lock:
+            self._confirmed_active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._confirmed_active -= 1
+                self._load_changed.notify_all()
+
+    def stats(self):
+        """返回统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._jobs)
+            stats['confirmed_active'] = self._confirmed_active
+        return stats
+
+    def _execute(self, job):
+        """在线程池中执行推测任务"""
+        # 确认任务进行中时等待，直到负载下降或任务被取消
+        with self._lock:
+            while (self._confirmed_active >= self._confirmed_high_water and
+                   not job.cancel_event.is_set()):
+                self._load_changed.wait(timeout=0.5)
+
+        if job.cancel_event.is_set():
+            # 等待期间被取消：_cancel_locked无法取消已开始的future，由这里清理文件
+            self._remove_file(job.file_path)
+            return None
+
+        try:
+            result = self._run_job(job.file_path, job.category)
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+            if job.cancel_event.is_set():
+                self._remove_file(job.file_path)
+            raise
+
+        with self._lock:
+            self._stats['completed'] += 1
+        if job.cancel_event.is_set():
+            # 运行期间被取消，丢弃结果
+            self._remove_file(job.file_path)
+            return None
+        return result
+
+    def _cancel_locked(self, job, reason):
+        """取消任务（需持有锁）"""
+        self._jobs.pop(job.token, None)
+        job.cancel_event.set()
+        self._load_changed.notify_all()
+        self._stats[reason] += 1
+        # 尚未开始的任务可以直接取消；运行中的任务在结束时自行清理文件
+        if job.future is None or job.future.cancel() or job.future.done():
+            self._remove_file(job.file_path)
+        print(f"推测式OCR任务已取消: {job.token} ({reason})")
+
+    def _sweep_loop(self):
+        """定期清理超时未认领的任务"""
+        while True:
+            time.sleep(self._sweep_interval)
+            deadline = time.time() - self._ttl_seconds
+            with self._lock:
+                for job in [j for j in self._jobs.values() if j.created_at < deadline]:
+                    self._cancel_locked(job, 'expired')
+
+    @staticmethod
+    def _remove_file(file_path):
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except OSError as e:
+            print(f"删除推测任务文件失败: {e}")
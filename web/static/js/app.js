@@ -11,6 +11,8 @@ let recordedText = "";
 let lastEditTime = 0; // 记录最后一次编辑时间
 let recordingMode = 'server'; // 默认使用服务器端录音
 let availableRecordingModes = ['browser', 'server']; // 可用的录音模式
+let speculativeToken = null; // 推测式OCR任务token
+let speculativeFile = null; // 推测式OCR任务对应的文件
 
 // DOM元素
 document.addEventListener('DOMContentLoaded', () => {
@@ -60,7 +62,8 @@ function connectSocket() {
     });
     
     socket.on('recognition_result', (data) => {
-        updateRecognitionText(data.text);
+        // 服务器会把短时间内的多段结果合并为一条消息
+        (data.segments || [data.text]).forEach(updateRecognitionText);
     });
     
     socket.on('recording_status', (data) => {
@@ -74,6 +77,16 @@ function connectSocket() {
         }
     });
     
+    socket.on('preset_changed', (data) => {
+        // 服务器根据负载在语句边界处切换了识别预设
+        console.log(`识别预设已切换: ${data.previous} -> ${data.preset}`);
+    });
+    
+    socket.on('audio_quality', (data) => {
+        // 服务器定期发送的麦克风质量报告
+        updateAudioQuality(data);
+    });
+    
     socket.on('recording_complete', (data) => {
         recordedText = data.text;
     });
@@ -90,6 +103,11 @@ function connectSocket() {
     
     socket.on('file_category', (data) => {
         document.getElementById('category-select').value = data.category;
+        
+        // 服务器启用推测式OCR时，选择文件后立即预先上传
+        if (data.speculative && selectedFile) {
+            prefetchFile(selectedFile);
+        }
     });
     
     socket.on('error', (data) => {
@@ -212,6 +230,51 @@ function handleFileSelect(files) {
     }
 }
 
+// OCR请求是否发往本服务的/upload（推测式OCR的结果只能在本服务的/upload中认领）
+function isLocalUploadUrl(apiUrl) {
+    try {
+        const url = new URL(apiUrl, window.location.href);
+        return url.origin === window.location.origin && /\/upload\/?$/.test(url.pathname);
+    } catch (e) {
+        return false;
+    }
+}
+
+// 预先上传文件，在后台启动推测式OCR
+function prefetchFile(file) {
+    const apiUrl = document.getElementById('api-url').value;
+    if (!isLocalUploadUrl(apiUrl)) {
+        console.log('OCR API地址不是本服务，跳过推测式OCR');
+        return;
+    }
+    
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('client_id', socket.id);
+    
+    speculativeToken = null;
+    speculativeFile = file;
+    
+    fetch('/prefetch', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(result => {
+        // 上传期间用户可能又选择了其他文件
+        if (result.status === 'accepted' && speculativeFile === file) {
+            speculativeToken = result.token;
+            console.log(`推测式OCR已启动: ${result.token}`);
+        } else {
+            console.log('推测式OCR未启动:', result.message || result.status);
+        }
+    })
+    .catch(error => {
+        // 预取失败不影响正常提交流程
+        console.warn('推测式OCR预取失败:', error);
+    });
+}
+
 // 防抖函数
 function debounce(func, wait) {
     let timeout;
@@ -303,13 +366,15 @@ async function startRecording() {
                 socket.emit('audio_data', { 
                     audio: base64Audio, 
                     bufferSize: audioData.length,
-                    expectedChunkSize: DESKTOP_CHUNK_SIZE
+                    expectedChunkSize: DESKTOP_CHUNK_SIZE,
+                    capturedSamples: input.length  // 本次实际采集的样本数，用于服务器估计采样率漂移
                 });
             };
         }
         
-        // 通知服务器开始录音，指定录音模式
-        socket.emit('start_recording', { mode: recordingMode });
+        // 通知服务器开始录音，指定录音模式和识别预设
+        const preset = document.getElementById('recording-preset').value;
+        socket.emit('start_recording', { mode: recordingMode, preset: preset });
         
         // 更新UI
         isRecording = true;
@@ -415,6 +480,13 @@ function processOCR() {
         }
     };
     
+    // 附带推测式OCR任务token，服务器将直接认领已在运行或已完成的结果
+    if (speculativeToken && speculativeFile === selectedFile) {
+        data.speculative_token = speculativeToken;
+        speculativeToken = null;
+        speculativeFile = null;
+    }
+    
     // 打印发送的数据内容到控制台
     console.log("发送到OCR API的数据:", data);
     
@@ -463,6 +535,26 @@ function updateStatus(status) {
     document.getElementById('status-label').textContent = status;
 }
 
+const AUDIO_QUALITY_WARNINGS = {
+    clipping: '削波（音量过大）',
+    dc_offset: '直流偏移',
+    too_quiet: '音量过小',
+    dropouts: '音频掉帧',
+    sample_rate_drift: '采样率漂移'
+};
+
+function updateAudioQuality(report) {
+    const element = document.getElementById('audio-quality');
+    const formatDb = (value) => value === null ? '--' : `${value} dB`;
+    let text = `音量 ${formatDb(report.rms_db)} | 峰值 ${report.peak.toFixed(2)} | ` +
+        `削波 ${(report.clip_ratio * 100).toFixed(2)}% | 底噪 ${formatDb(report.noise_floor_db)}`;
+    if (report.warnings.length > 0) {
+        text += ' | 警告: ' + report.warnings.map(w => AUDIO_QUALITY_WARNINGS[w] || w).join('、');
+    }
+    element.textContent = text;
+    element.className = report.warnings.length > 0 ? 'warning' : '';
+}
+
 function updateProcessingStatus(status, type = 'waiting') {
     const statusElement = document.getElementById('processing-status');
     const resultArea = document.getElementById('result-area');
@@ -531,6 +623,15 @@ function saveEditedText() {
 function displayResult(result) {
     const resultArea = document.getElementById('result-area');
     
+    // 显示服务器生成的文档缩略图
+    const thumbnail = document.getElementById('result-thumbnail');
+    if (result.thumbnail_url) {
+        thumbnail.src = result.thumbnail_url;
+        thumbnail.style.display = 'block';
+    } else {
+        thumbnail.style.display = 'none';
+    }
+    
     // 格式化并显示结果
     let formattedResult = '';
     
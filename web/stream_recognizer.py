@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式识别循环
+把接收到的音频按当前预设的识别块长度重新切分后送入识别器，并在语句边界处切换预设。
+实时识别（process_audio）和归档重放（replay_session）共用此流程，保证重放结果与实时结果一致
+
+语句边界：识别块能量低于预设的静音阈值，或低于会话平均能量且不超过底噪估计的noise_margin倍
+（底噪估计在前warmup_blocks个识别块内不可信）。
+等待切换超过max_defer_blocks个识别块仍未遇到边界时，在下一个能量低于会话平均水平的块处强制切换
+"""
+
+import numpy as np
+
+from asr_backend import recognize_chunk
+from preset_controller import preset_settings
+
+# chunk_size中每个单位对应的样本数（16kHz下60毫秒）
+SAMPLES_PER_UNIT = 960
+
+
+def stream_settings(recognizer, preset, base_settings):
+    """预设对应的流式识别参数；不支持动态分块的后端忽略每次调用的参数，保持加载时的配置"""
+    settings = preset_settings(preset, base_settings)
+    if not recognizer.dynamic_chunking:
+        for key in ('chunk_size', 'encoder_chunk_look_back', 'decoder_chunk_look_back'):
+            settings[key] = base_settings[key]
+    return settings
+
+
+def _recognition_params(settings):
+    """影响识别计算的参数（静音阈值等只影响边界判断）"""
+    return (tuple(settings['chunk_size']), settings['encoder_chunk_look_back'],
+            settings['decoder_chunk_look_back'])
+
+
+class StreamingRecognizer:
+    """
+    单个会话的流式识别
+
+    实时识别时由pending_switch()给出控制器要求的目标预设，在语句边界处切换；
+    重放时由schedule（[(样本偏移, 预设)]，即实时识别记录的切换点）在相同位置切换
+    """
+
+    def __init__(self, recognizer, base_settings, preset, pending_switch=None, schedule=None,
+                 on_result=None, on_switch=None, noise_margin=2.0, max_defer_blocks=10,
+                 noise_floor_rise=0.01, level_smoothing=0.1, warmup_blocks=5, verbose=False):
+        self._recognizer = recognizer
+        self._base_settings = base_settings
+        self._pending_switch = pending_switch
+        self._schedule = [tuple(item) for item in schedule or []]
+        self._on_result = on_result  # on_result(text, produced_at)
+        self._on_switch = on_switch  # on_switch(previous, preset, sample_offset)
+        self._noise_margin = noise_margin
+        self._max_defer_blocks = max_defer_blocks
+        self._noise_floor_rise = noise_floor_rise
+        self._level_smoothing = level_smoothing
+        self._warmup_blocks = warmup_blocks
+        self._verbose = verbose
+
+        self.preset = preset
+        self.settings = stream_settings(recognizer, preset, base_settings)
+        self.cache = {}
+        self.blocks = 0
+        self.samples_processed = 0
+        self._pending_audio = np.zeros(0, dtype=np.float32)
+        self._noise_floor = None  # 识别块能量的最小值跟踪
+        self._level = None  # 识别块能量的指数平滑
+        self._deferred_blocks = 0
+
+    def feed(self, audio_data, produced_at=None):
+        """追加音频，识别所有完整的识别块；produced_at为该段音频的入队时间"""
+        self._pending_audio = np.concatenate((self._pending_audio, audio_data))
+
+        while len(self._pending_audio) >= self.settings['chunk_size'][1] * SAMPLES_PER_UNIT:
+            step = self.settings['chunk_size'][1] * SAMPLES_PER_UNIT
+            speech_chunk, self._pending_audio = self._pending_audio[:step], self._pending_audio[step:]
+            self.blocks += 1
+            self.samples_processed += step
+            if self._verbose:
+                print(f"处理音频块 {self.blocks}, 形状={speech_chunk.shape}")
+
+            # 在语句边界切换预设：用旧参数结束当前语句，再以新参数和新缓存开始下一句
+            target = self._switch_target(speech_chunk)
+            res = recognize_chunk(self._recognizer, speech_chunk, self.cache, target is not None, self.settings)
+            self._emit(res, produced_at)
+            if target is not None:
+                self._switch(target)
+
+    def finish(self):
+        """录音结束，识别剩余音频并输出最后的结果（没有剩余音频时用一小段静音结束语句）"""
+        if self.cache or len(self._pending_audio) > 0:
+            final_chunk = self._pending_audio if len(self._pending_audio) > 0 else np.zeros(SAMPLES_PER_UNIT, dtype=np.float32)
+            self.samples_processed += len(self._pending_audio)
+            self._pending_audio = np.zeros(0, dtype=np.float32)
+            res = recognize_chunk(self._recognizer, final_chunk, self.cache, True, self.settings)
+            self._emit(res, None)
+        self.cache = {}
+
+    def _switch_target(self, speech_chunk):
+        """该识别块结束后需要切换到的预设；不切换时返回None"""
+        rms = float(np.sqrt(np.dot(speech_chunk, speech_chunk) / speech_chunk.size))
+        boundary, quieter = self._update_levels(rms)
+
+        if self._schedule:
+            offset, preset = self._schedule[0]
+            if self.samples_processed < offset:
+                return None
+            self._schedule.pop(0)
+            return preset if preset != self.preset else None
+
+        if self._pending_switch is None:
+            return None
+        target = self._pending_switch()
+        if target is None or target == self.preset:
+            self._deferred_blocks = 0
+            return None
+        # 识别参数相同的切换（如ONNX后端忽略预设参数）只会打断语句，没有收益
+        target_settings = stream_settings(self._recognizer, target, self._base_settings)
+        if _recognition_params(target_settings) == _recognition_params(self.settings):
+            self._deferred_blocks = 0
+            return None
+
+        self._deferred_blocks += 1
+        if boundary or (self._deferred_blocks > self._max_defer_blocks and quieter):
+            return target
+        return None
+
+    def _update_levels(self, rms):
+        """
+        更新会话的底噪和平均能量，返回(是否为语句边界, 是否低于平均能量)
+        底噪按最小值跟踪：遇到更安静的块立即下降，否则缓慢上升
+        """
+        quieter = self._level is not None and rms < self._level
+        near_floor = (self.blocks > self._warmup_blocks and quieter and
+                      rms <= self._noise_floor * self._noise_margin)
+        boundary = rms < self.settings['silence_threshold'] or near_floor
+
+        if self._noise_floor is None or rms < self._noise_floor:
+            self._noise_floor = rms
+        else:
+            self._noise_floor *= 1 + self._noise_floor_rise
+        if self._level is None:
+            self._level = rms
+        else:
+            self._level += self._level_smoothing * (rms - self._level)
+        return boundary, quieter
+
+    def _switch(self, preset):
+        previous = self.preset
+        self.preset = preset
+        self.settings = stream_settings(self._recognizer, preset, self._base_settings)
+        self.cache = {}
+        self._deferred_blocks = 0
+        if self._on_switch:
+            self._on_switch(previous, preset, self.samples_processed)
+
+    def _emit(self, res, produced_at):
+        if self._on_result and res and len(res) > 0:
+            text = res[0].get('text', '')
+            if text.strip():
+                self._on_result(text, produced_at)
@@ -83,6 +83,9 @@ def main() -> None:
     parser.add_argument('--debug', action='store_true', help='启用debug模式')
     parser.add_argument('--no-browser', action='store_true', help='不自动打开浏览器')
     parser.add_argument('--port', type=int, default=8080, help='服务器端口 (默认: 8080)')
+    parser.add_argument('--export', choices=['onnx', 'onnx_int8'], help='导出ONNX推理模型（onnx_int8为int8量化版本）后退出')
+    parser.add_argument('--replay', metavar='SESSION_ID', nargs='?', const='',
+                        help='使用当前模型重新识别归档的会话音频后退出（不指定SESSION_ID时列出已归档的会话）')
     args = parser.parse_args()
     
     print("=" * 50)
@@ -94,6 +97,39 @@ def main() -> None:
         input("按回车键退出...")
         return
     
+    # 一次性导出/转换推理模型
+    if args.export:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web"))
+        from asr_backend import load_model_settings, export_model
+        try:
+            export_model(load_model_settings(), args.export)
+        except Exception as e:
+            print(f"✗ 模型导出失败: {e}")
+        return
+    
+    # 重新识别归档的会话音频
+    if args.replay is not None:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web"))
+        from audio_config import ArchiveConfig
+        from asr_backend import load_model_settings, create_recognizer
+        from audio_archive import list_sessions, replay_session
+        if not args.replay:
+            sessions = list_sessions(ArchiveConfig.ARCHIVE_DIR)
+            print(f"已归档的会话 ({len(sessions)}):")
+            for meta in sessions:
+                started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta.get('started_at', 0)))
+                seconds = meta.get('samples', 0) / meta.get('sample_rate', 16000)
+                print(f"  {meta['session_id']}  {started}  {seconds:.1f}秒  预设={meta.get('preset', 'default')}")
+            return
+        try:
+            settings = load_model_settings()
+            text, rtf = replay_session(ArchiveConfig.ARCHIVE_DIR, args.replay, create_recognizer(settings), settings)
+            print(f"识别结果: {text}")
+            print(f"实时率(RTF): {rtf:.3f}")
+        except Exception as e:
+            print(f"✗ 会话重放失败: {e}")
+        return
+    
     # 检查必要的包
     required_packages = ['flask', 'flask_socketio', 'funasr', 'numpy', 'requests']
     missing_packages = [pkg for pkg in required_packages if not check_package(pkg)]
@@ -127,7 +163,8 @@ def main() -> None:
         print(f"Python版本: {sys.version}")
         print(f"当前工作目录: {os.getcwd()}")
         
-        # 导入并启动应用
+        # 导入并启动应用（web目录加入搜索路径，以便app.py导入同目录模块）
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web"))
         from web.app import socketio, app
         
         # 设置服务器URL